@@ -0,0 +1,309 @@
+"""
+Performance benchmarks for the renderer, boot video and game loop.
+
+Runs headless (SDL dummy video driver) and writes machine-readable results:
+
+    python benchmark.py                         # run, compare with bench_baseline.json
+    python benchmark.py --save-baseline --note "Pi 4, 2026-10"   # run and store the new baseline
+    python benchmark.py --no-baseline           # run without comparing
+
+Exits with status 1 when a metric regressed by more than --tolerance against
+the baseline, or when the full loop's p99 frame time misses the 30 FPS budget.
+The baseline is committed next to this file. Baselines are machine specific:
+against one recorded on another machine the comparison is only printed, so
+record one on the Pi (--save-baseline) and commit it.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from bomb_app import config
+from bomb_app.engine import GameEngine
+from bomb_app.hardware.keypad import KeyEvent
+from bomb_app.simulation import RecordingBuzzer, RecordingTelegram, press, setup_script
+from bomb_app.state_machine import StateMachine, GameState
+from bomb_app.ui.renderer import Renderer
+
+TARGET_FPS = 30  # The Pi must hold this in the full loop
+RESULTS_PATH = "bench_results.json"
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")  # Committed reference
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed(fn, repeat, rounds=5):
+    """Milliseconds per call of fn(i), best of rounds runs over range(repeat) (least noisy)"""
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for i in range(repeat):
+            fn(i)
+        elapsed = (time.perf_counter() - start) * 1000.0 / repeat
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def prepare_state(sm, state):
+    sm.set_times(90, 60)
+    sm.transition_to(state)
+    if state == GameState.DEFUSE_PHASE:
+        sm.pin_mode = 2
+        sm.log("PIN REVEALED: 1234")
+        sm.show_console = True
+
+
+def bench_render(renderer, frames):
+    """Renderer.render + update per GameState, with the countdown changing every frame"""
+    results = {}
+    labels = {
+        GameState.PIN_TYPE_SELECT: ("1", "SELECT PIN TYPE (1:STAT, 2:DYN, 3:TG)"),
+        GameState.CONFIG: ("45", "SET PLANT TIME"),
+        GameState.PLANT_PHASE: ("12**", "CODE"),
+        GameState.DEFUSE_PHASE: ("12**", "INSERT PIN"),
+    }
+    for state in GameState:
+        if state == GameState.BOOT:
+            continue  # Covered by the video benchmarks
+        sm = StateMachine()
+        prepare_state(sm, state)
+        current_input, label = labels.get(state, ("", ""))
+
+        def frame(i):
+            sm.current_timer = 60 - i / TARGET_FPS
+            renderer.render(sm, current_input, input_label=label, screen_blink=(i // 30) % 2 == 1, text_blink=(i // 15) % 2 == 1)
+            renderer.update()
+        frame(0)  # Warm the layer and text caches
+        results[f"render.{state.name}.ms"] = timed(frame, frames)
+    return results
+
+
+def compiled_animations(tmpdir):
+    """Boot video players to benchmark: {name: opener}"""
+    from bomb_app.ui import boot_animation, boot_video
+    players = {}
+    if os.path.exists(config.BOOT_VIDEO_PATH):
+        players["video.stream"] = lambda: boot_video.stream_video(config.BOOT_VIDEO_PATH)
+        players["video.cache"] = lambda: boot_video.load_video(config.BOOT_VIDEO_PATH)
+        for name, fmt in boot_animation.FORMAT_NAMES.items():
+            path = os.path.join(tmpdir, f"boot_{name}.banm")
+            try:
+                boot_animation.compile_animation(config.BOOT_VIDEO_PATH, path, fmt)
+            except Exception as e:
+                print(f"[BENCH] Skipping {name} animation: {e}")
+                continue
+            players[f"video.animation_{name}"] = lambda path=path: boot_animation.load_animation(path)
+    elif os.path.exists(config.BOOT_ANIMATION_PATH):
+        players["video.animation"] = lambda: boot_animation.load_animation(config.BOOT_ANIMATION_PATH)
+    return players
+
+
+def bench_video(renderer, max_frames):
+    """Boot video frames per second through frame_at + render, per playback path"""
+    results = {}
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for name, opener in compiled_animations(tmpdir).items():
+            start = time.perf_counter()
+            player = opener()
+            if player is None:
+                continue
+            if hasattr(player, "wait_ready") and not player.wait_ready(30):
+                player.close()
+                continue  # The stream opens OpenCV in the background
+            results[f"{name}.open_ms"] = (time.perf_counter() - start) * 1000.0
+            sm = StateMachine()
+            frames = min(max_frames, getattr(player, "frame_count", 0) or max_frames)
+
+            start = time.perf_counter()
+            shown = 0
+            for i in range(frames):
+                frame = player.frame_at(i / player.fps)
+                # The stream never blocks the loop; here wait for its decoder to measure throughput
+                waited = time.perf_counter()
+                while player.frame_index < i and time.perf_counter() - waited < 1.0:
+                    time.sleep(0.0005)
+                    frame = player.frame_at(i / player.fps)
+                if player.frame_index < i:
+                    break  # End of the video
+                renderer.render(sm, video_frame=frame, video_frame_id=player.frame_index)
+                renderer.update()
+                shown += 1
+            elapsed = time.perf_counter() - start
+            player.close()
+            if shown:
+                results[f"{name}.fps"] = shown / elapsed
+    finally:
+        for entry in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, entry))
+        os.rmdir(tmpdir)
+    return results
+
+
+def bench_tick(repeat):
+    """StateMachine.tick and GameEngine.step cost in a countdown"""
+    sm = StateMachine()
+    sm.set_times(10 ** 9, 10 ** 9)
+    sm.transition_to(GameState.PLANT_PHASE)
+    dt = 1.0 / config.LOGIC_HZ
+    results = {"tick.us": timed(lambda i: sm.tick(dt), repeat) * 1000.0}
+
+    engine = GameEngine(RecordingBuzzer(), RecordingTelegram(), has_boot_video=False)
+    engine.buzzer.engine = engine
+    engine.step(dt, [KeyEvent(key, pressed, 0) for _, key, pressed in setup_script()])
+    engine.sm.set_times(10 ** 9, 10 ** 9)
+    engine.sm.transition_to(GameState.DEFUSE_PHASE)
+    results["engine_step.us"] = timed(lambda i: engine.step(dt), repeat) * 1000.0
+    return results
+
+
+def bench_loop(renderer, seconds):
+    """
+    Frame times of the full loop (logic steps + labels + render + present) over a
+    scripted round played at TARGET_FPS, without the idle sleep.
+    """
+    engine = GameEngine(RecordingBuzzer(), RecordingTelegram(), has_boot_video=False)
+    engine.buzzer.engine = engine
+    plant = 40
+    script = setup_script(0.1) + press("*", 2.0) + press("*" + config.ARM_PIN + "#", 4.0)
+    script += press("*", plant / 2) + press(config.DEFUSE_PIN + "#", plant / 2 + 1.0)
+    script.sort(key=lambda event: event[0])
+
+    logic_dt = 1.0 / config.LOGIC_HZ
+    frame_dt = 1.0 / TARGET_FPS
+    frame_times = []
+    game_time = 0.0
+    next_event = 0
+    for frame in range(int(seconds * TARGET_FPS)):
+        start = time.perf_counter()
+        target = (frame + 1) * frame_dt
+        while game_time + logic_dt <= target + 1e-9:
+            events = []
+            while next_event < len(script) and script[next_event][0] <= game_time:
+                _, key, pressed = script[next_event]
+                events.append(KeyEvent(key, pressed, game_time))
+                next_event += 1
+            engine.step(logic_dt, events)
+            game_time += logic_dt
+        display_input, label = engine.labels()
+        renderer.render(engine.sm, display_input, input_label=label, screen_blink=engine.screen_blink_state, text_blink=engine.text_blink_state)
+        if engine.message_overlay:
+            renderer.draw_text(engine.message_overlay, renderer.font_large, config.COLOR_RED, (renderer.width // 2, renderer.height // 2))
+        renderer.update()
+        frame_times.append((time.perf_counter() - start) * 1000.0)
+
+    return {
+        "loop.frame_p50.ms": percentile(frame_times, 50),
+        "loop.frame_p95.ms": percentile(frame_times, 95),
+        "loop.frame_p99.ms": percentile(frame_times, 99),
+        "loop.frame_max.ms": max(frame_times),
+    }
+
+
+def higher_is_better(name):
+    return name.endswith(".fps")
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages, printing a comparison table"""
+    regressions = []
+    print(f"\n{'metric':40s} {'baseline':>10s} {'now':>10s} {'change':>8s}")
+    for name in sorted(results):
+        value = results[name]
+        base = baseline.get(name)
+        if base is None or base == 0:
+            print(f"{name:40s} {'-':>10s} {value:10.3f}")
+            continue
+        change = (value - base) / base
+        worse = -change if higher_is_better(name) else change
+        flag = ""
+        if worse > tolerance and not name.endswith("open_ms") and not name.endswith("max.ms"):
+            flag = "  REGRESSION"
+            regressions.append(f"{name}: {base:.3f} -> {value:.3f} ({change:+.0%})")
+        print(f"{name:40s} {base:10.3f} {value:10.3f} {change:+8.0%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the renderer, boot video and game loop")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (smoke run)")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Where to write results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against (default: the committed one)")
+    parser.add_argument("--no-baseline", action="store_true", help="Don't compare against a baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the new --baseline")
+    parser.add_argument("--note", default="", help="Label stored with the results (e.g. which board recorded them)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.no_baseline and not args.save_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        else:
+            print(f"[WARNING] No baseline at {args.baseline}, nothing to compare against")
+
+    scale = 0.1 if args.quick else 1.0
+    renderer = Renderer()
+    results = {}
+    results.update(bench_render(renderer, int(300 * scale)))
+    results.update(bench_video(renderer, int(300 * scale)))
+    results.update(bench_tick(int(100000 * scale)))
+    results.update(bench_loop(renderer, 60 * scale))
+    pygame.quit()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+            "quick": args.quick,
+            "note": args.note,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"[BENCH] Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"[BENCH] Baseline saved to {args.baseline}")
+
+    failures = []
+    if baseline is not None:
+        meta = baseline["meta"]
+        print(f"[BENCH] Baseline: {meta['machine']} {meta['platform']}, {meta['timestamp']} {meta.get('note', '')}")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if meta["machine"] == report["meta"]["machine"] and meta["platform"] == report["meta"]["platform"]:
+            failures += regressions
+        elif regressions:
+            print("[WARNING] Baseline recorded on another machine: regressions not counted, record one here with --save-baseline")
+    else:
+        for name in sorted(results):
+            print(f"{name:40s} {results[name]:10.3f}")
+
+    budget = 1000.0 / TARGET_FPS
+    if results["loop.frame_p99.ms"] > budget:
+        failures.append(f"loop.frame_p99.ms: {results['loop.frame_p99.ms']:.1f} ms is over the {TARGET_FPS} FPS budget ({budget:.1f} ms)")
+
+    for failure in failures:
+        print(f"[BENCH] FAIL {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
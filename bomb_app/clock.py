@@ -0,0 +1,67 @@
+import time
+
+
+class GameClock:
+    """
+    Monotonic nanosecond clock the countdown deadlines are measured on.
+
+    Real time passes by itself, so advance() does nothing; source can be
+    swapped for a fake in tests. While paused, now_ns() stands still and
+    the paused stretch is left out of the game time for good.
+    """
+    def __init__(self, source=time.monotonic_ns):
+        self.source = source
+        self._paused_at = None
+        self._paused_ns = 0  # Total time spent paused
+
+    def now_ns(self):
+        if self._paused_at is not None:
+            return self._paused_at - self._paused_ns
+        return self.source() - self._paused_ns
+
+    def advance(self, dt):
+        """Called with every logic step; only virtual clocks move here"""
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = self.source()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._paused_ns += self.source() - self._paused_at
+            self._paused_at = None
+
+
+class ManualClock(GameClock):
+    """
+    Virtual clock that only moves when the logic steps, by whole nanoseconds.
+    Used by the simulator, the tests and a StateMachine without a real clock.
+    """
+    def __init__(self):
+        self._now_ns = 0
+        super().__init__(source=lambda: self._now_ns)
+
+    def now_ns(self):
+        # GameClock.now_ns without the source call, read several times per simulated step
+        if self._paused_at is not None:
+            return self._paused_at - self._paused_ns
+        return self._now_ns - self._paused_ns
+
+    def advance(self, dt):
+        self._now_ns += round(dt * 1e9)
+
+
+class ReplayClock(GameClock):
+    """
+    Clock of a replayed session: the time of the step being replayed plus
+    offset_ns, the drift the recorded countdown clock had at that step.
+    It stands still within a step; ReplayHardware.advance() moves it.
+    """
+    def __init__(self):
+        self.step_ns = 0
+        self.offset_ns = 0
+        super().__init__(source=lambda: self.step_ns + self.offset_ns)
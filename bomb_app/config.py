@@ -1,10 +1,23 @@
 
+import os
+
+# Where registered players and session telemetry are kept: next to main.py unless
+# BOMB_DATA_DIR says otherwise, so a systemd unit or another working directory finds them
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.getenv("BOMB_DATA_DIR", APP_DIR)
+
 # Default Settings
 DEFAULT_PLANT_TIME = 60  # Seconds
 DEFAULT_DEFUSE_TIME = 60 # Seconds
 
 # Boot Video
 BOOT_VIDEO_PATH = "bomb_app/assets/boot_video.mp4"
+BOOT_VIDEO_MODE = "stream"  # MP4 fallback: "stream" (background decoder) or "cache" (decode all up front)
+BOOT_VIDEO_QUEUE_SIZE = 8  # Frames decoded ahead in "stream" mode
+BOOT_VIDEO_MEMORY_BUDGET_MB = 32  # "cache" mode: decoded frames above this spill to a memory-mapped file
+# Compiled animation (python -m bomb_app.ui.boot_animation), played without OpenCV
+BOOT_ANIMATION_PATH = "bomb_app/assets/boot_video.banm"
+BOOT_ANIMATION_FORMAT = "RGB888"  # "RGB888" (zero-copy playback) or "RGB565" (half the size)
 
 # PINS
 ARM_PIN = "1234"
@@ -19,11 +32,63 @@ PIN_ROW_4 = 22
 PIN_COL_1 = 10
 PIN_COL_2 = 9
 PIN_COL_3 = 11
+KEYPAD_SCAN_HZ = 500  # Background keypad scan rate
+KEYPAD_DEBOUNCE_MS = 20  # A key must read the same for this long to change state
+KEYPAD_EVENT_QUEUE_SIZE = 64  # Press/release events waiting for the game loop
 
 PIN_BUZZER = 18
+BUZZER_QUEUE_SIZE = 16  # Beep patterns waiting to play, extra beeps are dropped
 PIN_LED_RED = 23
 PIN_LED_GREEN = 24
 
+# Player registry (PIN modes 2/3), kept across restarts; manage with python -m bomb_app.players
+PLAYERS_PATH = os.path.join(DATA_DIR, "players.tsv")  # "" keeps players in memory only
+PLAYERS_MAX = 500
+PLAYERS_MIN_DIGITS = 4  # Shorter entries are refused as typos
+PLAYERS_DEFAULT_TEAM = "CT"  # Registered players are the defusing team
+PLAYERS_CLEAR_CODE = "0000"  # Typed + # on the registration screen: unregister everyone (new event)
+
+# Console overlay (PIN reveal)
+CONSOLE_LOG_LINES = 10  # Log records kept and shown
+
+# Round telemetry (python -m bomb_app.telemetry for statistics)
+TELEMETRY_DIR = os.path.join(DATA_DIR, "telemetry")  # One file per session ("" disables recording)
+TELEMETRY_KEEP_SESSIONS = 500  # Oldest session files are deleted beyond this
+TELEMETRY_BUFFER_RECORDS = 256  # Records packed in memory between file appends
+TELEMETRY_CLOCK_STALL_MS = 50  # Countdown clock drift from the logic steps recorded past this (stalls, not jitter)
+
+# Startup
+STARTUP_BUDGET_MS = 500  # Target from launch to the first frame, checked in the startup report
+
+# Frame pacing
+LOGIC_HZ = 100  # Fixed logic/input update rate
+MAX_LOGIC_STEPS = 100  # Logic steps replayed at most after a stall (1s at 100 Hz)
+RENDER_FPS_MAX = 60  # BOOT video and countdown phases, and after any visible change
+RENDER_FPS_IDLE = 5  # Menus and end screens
+
+# Rendering
+RENDER_DIRTY_RECTS = True  # Push only changed regions with display.update(rects) instead of flip()
+TEXT_CACHE_SIZE = 128  # Max rendered text surfaces kept by the renderer (LRU)
+
+# Profiler / debug HUD (off until toggled: hold * and # together, or F3 on desktop)
+PROFILER_TOGGLE_KEYS = ('*', '#')
+PROFILER_TOGGLE_HOLD = 1.0  # Seconds both keys must be held
+PROFILER_TOGGLE_WINDOW = 0.15  # Seconds a * or # press waits for its partner before the game gets it
+PROFILER_HISTORY = 300  # Frames kept per phase for the HUD percentiles
+PROFILER_HUD_HZ = 4  # HUD text refresh rate
+PROFILER_FILE = "profile.ring"  # Ring-buffered timings, read with: python -m bomb_app.profiler
+PROFILER_FILE_RECORDS = 30000  # Frames kept in the file before it wraps
+
+# Multi-prop sync over the LAN (python -m bomb_app.netsync start|reset|restart|status)
+NETSYNC_ENABLED = False
+NETSYNC_DEVICE_ID = ""  # Name of this prop ("" = hostname)
+NETSYNC_GROUP = "239.255.42.99"  # Multicast group shared by the props and the controller
+NETSYNC_PORT = 5005
+NETSYNC_PEERS = []  # ("host", port) list to use unicast instead of multicast
+NETSYNC_HEARTBEAT = 0.5  # Seconds between state broadcasts and clock pings
+NETSYNC_COMMAND_REPEAT = 3  # Copies of each command sent (UDP may drop one)
+NETSYNC_REMOTE_EVENTS = ("start", "reset", "restart")  # Events the controller may trigger
+
 # Colors
 COLOR_BLACK = (0, 0, 0)
 COLOR_WHITE = (255, 255, 255)
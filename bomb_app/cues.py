@@ -0,0 +1,82 @@
+import heapq
+import math
+
+# Cue kinds
+BEEP = "beep"
+BLINK = "blink"  # Toggle the screen blink
+
+
+def _marks(first, count, step):
+    """first, first - step, ... (count values), rounded like the bomb timer"""
+    for i in range(count):
+        yield round(first - i * step, 6)
+
+
+def _fast_beeps(duration):
+    """0.5s beeps from 10s down to 3.5s, then 0.25s beeps from 3s down to 0.25s"""
+    halves = int(min(duration, 10) * 2)
+    yield from _marks(halves / 2, max(0, halves - 6), 0.5)
+    quarters = int(min(duration, 3) * 4)
+    yield from _marks(quarters / 4, quarters, 0.25)
+
+
+def _defuse_beeps(duration):
+    """A beep every whole second down to 11s, then the fast beeps"""
+    seconds = int(duration)
+    yield from _marks(seconds, max(0, seconds - 10), 1)
+    yield from _fast_beeps(duration)
+
+
+def _plant_marks(duration):
+    """A beep on every 30s mark below the start time"""
+    marks = int(duration // 30)
+    if marks * 30 >= duration:
+        marks -= 1
+    yield from _marks(marks * 30, max(0, marks), 30)
+
+
+def _tag(marks, kind):
+    for at in marks:
+        yield (at, kind)
+
+
+def plant_cues(duration):
+    """PLANT_PHASE: screen blink every second, 30s mark beeps, fast beeps at the end"""
+    blinks = _marks(round(duration - 1, 6), max(0, math.ceil(duration) - 1), 1)
+    return heapq.merge(_tag(blinks, BLINK), _tag(_plant_marks(duration), BEEP), _tag(_fast_beeps(duration), BEEP),
+                       key=lambda cue: cue[0], reverse=True)
+
+
+def defuse_cues(duration):
+    """DEFUSE_PHASE: every beep also toggles the screen blink"""
+    return heapq.merge(_tag(_defuse_beeps(duration), BEEP), _tag(_defuse_beeps(duration), BLINK),
+                       key=lambda cue: cue[0], reverse=True)
+
+
+class CueSchedule:
+    """
+    Timeline of a countdown's cues as (remaining seconds, kind), latest first,
+    worked through with a cursor.
+
+    Built once on entering the phase; each step hands over every cue whose
+    time has been reached, so a cue fires exactly once whatever the step size.
+    The timeline is merged from per-rhythm generators, so a long countdown
+    costs no more memory than a short one.
+    """
+    def __init__(self, cues):
+        self._cues = iter(cues)
+        self._next = next(self._cues, None)
+
+    def due(self, remaining):
+        """Kinds of all cues at or above remaining, in order, moving the cursor past them"""
+        fired = []
+        while self._next is not None and self._next[0] >= remaining:
+            fired.append(self._next[1])
+            self._next = next(self._cues, None)
+        return fired
+
+    def next_in(self, remaining):
+        """Seconds from remaining until the next cue is due"""
+        if self._next is None:
+            return float("inf")
+        return remaining - self._next[0]
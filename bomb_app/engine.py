@@ -0,0 +1,479 @@
+from . import config, cues
+from .logbuffer import console
+from .startup import run_in_background
+from .telemetry import WRONG_PIN, WRONG_PHONE, REVEAL
+from .state_machine import StateMachine, GameState, END_STATES
+from .players import RegistrationError
+from .telegram_config import TELEGRAM_CHAT_ID_TERRORISTS, TELEGRAM_CHAT_ID_COUNTERTERRORISTS
+
+COUNTDOWN_STATES = (GameState.PLANT_PHASE, GameState.DEFUSE_PHASE)
+
+
+class GameEngine:
+    """
+    The game rules, without pygame, a display or real hardware.
+
+    The caller owns the clock: step(dt, key_events) advances the game by dt
+    seconds (main uses the fixed-timestep scheduler, the simulator virtual
+    time). The countdown itself runs on clock: a GameClock for real
+    deadlines (main) or, by default, a ManualClock moved by step().
+    Output goes through buzzer (beep/cancel_beep, e.g. the hardware) and
+    telegram (start/broadcast, the real service if None).
+    An optional profiler gets a mark() after each phase of a step, and an
+    optional TelemetryRecorder every key event, state change and wrong entry.
+
+    State changes go through the StateMachine transition table: key
+    handlers (one per state) turn keys into events, and per-state setup
+    lives in entry hooks.
+    """
+    def __init__(self, buzzer, telegram=None, has_boot_video=True, profiler=None, clock=None, telemetry=None):
+        self.buzzer = buzzer
+        self.telegram = telegram
+        self.profiler = profiler  # Optional FrameProfiler, charged per phase of step()
+        self.has_boot_video = has_boot_video
+        self.tg_chat_id_terrorists = TELEGRAM_CHAT_ID_TERRORISTS
+        self.tg_chat_id_counterterrorists = TELEGRAM_CHAT_ID_COUNTERTERRORISTS
+        self.sm = StateMachine(clock)
+        self.time = 0.0  # Game seconds stepped so far
+
+        # State Helpers
+        self.config_step = 0 # 0=Plant, 1=Defuse
+        self.defuse_step = 0 # 0=Phone Number, 1=PIN
+        self.input_buffer = ""
+        self.showing_input = False # For Plant/Defuse phases, do we show input field?
+        self.message_overlay = "" # For "WRONG CODE" etc.
+        self.message_timer = 0
+
+        self.current_keys = set()
+        self.hash_hold_time = 0
+
+        # Blink and Buzzer timing
+        self.blink_timer = 0  # For screen/text blinking
+        self.screen_blink_state = False  # Current blink state
+        self.text_blink_state = False
+        self.cues = None  # CueSchedule of the running countdown (beeps and screen blinks)
+
+        self.video_time = 0  # Seconds of boot video played
+
+        # Initialize defaults
+        self.sm.set_times(config.DEFAULT_PLANT_TIME, config.DEFAULT_DEFUSE_TIME)
+
+        sm = self.sm
+        sm.actions = {
+            "start_telegram": self._start_telegram,
+            "notify_planted": self._notify_planted,
+            "cancel_beep": self.buzzer.cancel_beep, # Drop countdown beeps still queued
+            "show_reset": lambda: self._show_message("RESETting...", 1.0),
+        }
+        sm.on_enter(None, self._enter_state)
+        sm.on_enter(GameState.CONFIG, self._enter_config)
+        sm.on_enter(GameState.PLANT_PHASE, lambda: self._start_cues(cues.plant_cues(sm.current_timer)))
+        sm.on_enter(GameState.DEFUSE_PHASE, lambda: self._start_cues(cues.defuse_cues(sm.current_timer)))
+
+        # One key handler per state, looked up in O(1) per key press
+        self._key_handlers = {
+            GameState.BOOT: self._key_boot,
+            GameState.PIN_TYPE_SELECT: self._key_pin_type_select,
+            GameState.PLAYER_REGISTRATION: self._key_player_registration,
+            GameState.CONFIG: self._key_config,
+            GameState.READY: self._key_ready,
+            GameState.PLANT_PHASE: self._key_plant,
+            GameState.DEFUSE_PHASE: self._key_defuse,
+        }
+        for state in END_STATES:
+            self._key_handlers[state] = self._key_end
+            sm.on_enter(state, lambda: sm.players.flush()) # Save the round's reveal counts
+
+        self.telemetry = telemetry
+        if telemetry is not None:
+            telemetry.attach(self)
+
+    def _telegram(self):
+        if self.telegram is None:
+            from .telegram_service import telegram_service  # Pulls in requests, only load for PIN mode 3
+            self.telegram = telegram_service
+        return self.telegram
+
+    # --- Entry hooks ---
+
+    def _enter_state(self):
+        """Every state starts with a blank, hidden input, a fresh blink timer and no cues"""
+        self.input_buffer = ""
+        self.showing_input = False
+        self.blink_timer = 0
+        self.cues = None
+
+    def _enter_config(self):
+        self.config_step = 0
+
+    def _start_cues(self, timeline):
+        # Runs after the state machine's own hook has set current_timer
+        self.cues = cues.CueSchedule(timeline)
+
+    # --- Transition actions ---
+
+    def _start_telegram(self):
+        if self.sm.pin_mode == 3:
+            # Open the outbox and sender threads now, not in the middle of the round.
+            # Off the game loop: first use loads requests and start() waits for the disk
+            run_in_background("telegram", lambda: self._telegram().start())
+
+    def _notify_planted(self):
+        sm = self.sm
+        if sm.pin_mode == 3:
+            # Mode 3: Send Telegram on Plant
+            msg_counterterrorists = f"THE BOMB HAS BEEN PLANTED!\n{sm.defuse_time} TO EXPLOSION"
+            player_chat_ids = sm.players.chat_ids()
+            self._telegram().broadcast([self.tg_chat_id_counterterrorists] + player_chat_ids, msg_counterterrorists)
+            msg_terrorists = "BOMB PLANTED!\nPROTECT AT ALL COSTS!"
+            self._telegram().broadcast([self.tg_chat_id_terrorists], msg_terrorists)
+
+    def _show_message(self, text, seconds):
+        self.message_overlay = text
+        self.message_timer = seconds
+
+    def _beep(self, duration_ms):
+        self.buzzer.beep(duration_ms)
+
+    def step(self, dt, key_events=()):
+        """Advance the game by dt seconds, handling the KeyEvents that arrived since the last step"""
+        sm = self.sm
+        self.time += dt
+        if self.telemetry is not None:
+            self.telemetry.tick(dt)
+
+        # Debounced press/release events, so presses shorter than a step are not lost
+        just_pressed = []
+        for key_event in key_events:
+            if self.telemetry is not None:
+                self.telemetry.key(key_event)
+            if key_event.pressed:
+                self.current_keys.add(key_event.key)
+                just_pressed.append(key_event.key)
+            else:
+                self.current_keys.discard(key_event.key)
+
+        # --- GLOBAL LOGIC (Hold # to Config) ---
+        if '#' in self.current_keys:
+            self.hash_hold_time = round(self.hash_hold_time + dt, 6)
+            if self.hash_hold_time > 2.0:
+                # LONG PRESS RESET
+                sm.dispatch("reset")
+                self.hash_hold_time = 0
+        else:
+            self.hash_hold_time = 0
+
+        # --- STATE LOGIC ---
+        countdown = self.cues  # Cues reached in the step the timer runs out still fire
+        sm.tick(dt)
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.mark("tick")
+
+        # --- BUZZER AND BLINK LOGIC ---
+        # Update blink timer
+        self.blink_timer = round(self.blink_timer + dt, 6)  # Same rounding as the bomb timer
+
+        # BOOT state: Video playback
+        if sm.state == GameState.BOOT:
+            if self.has_boot_video:
+                # Frames are picked by play time, so a slow frame drops video frames instead of slowing the loop
+                self.video_time += dt
+            else:
+                # If no video file exists, auto-skip
+                sm.dispatch("skip")
+
+        # Countdown cues: PLANT_PHASE blinks every second and beeps on 30s marks,
+        # DEFUSE_PHASE beeps (and blinks) every second; both speed up below 10s and 3s
+        if countdown is not None and (countdown is self.cues or sm.state in END_STATES):
+            for cue in countdown.due(sm.current_timer):
+                if cue == cues.BEEP:
+                    self._beep(100)
+                else:
+                    self.screen_blink_state = not self.screen_blink_state
+
+        # Text blink for end states (every 0.5 seconds)
+        if sm.state in END_STATES:
+            if self.blink_timer >= 0.5:
+                self.text_blink_state = not self.text_blink_state
+                self.blink_timer = 0
+        else:
+            self.text_blink_state = False
+
+        # Reset blink states when leaving countdown phases
+        if sm.state not in COUNTDOWN_STATES:
+            self.screen_blink_state = False
+
+        # Message overlay timer
+        if self.message_timer > 0:
+            self.message_timer = round(self.message_timer - dt, 6)
+            if self.message_timer <= 0:
+                self.message_overlay = ""
+
+        if profiler is not None:
+            profiler.mark("buzzer")
+
+        # Handle Key Presses
+        for key in just_pressed:
+            self.press(key)
+        if profiler is not None:
+            profiler.mark("keys")
+
+    def press(self, key):
+        """Apply one key press to the current screen"""
+        if self.message_timer > 0: # Clear message on any key
+            self.message_overlay = ""
+
+        # BEEP on press
+        self._beep(50)
+
+        handler = self._key_handlers.get(self.sm.state)
+        if handler is not None:
+            handler(key)
+
+    # --- Key handlers, one per state ---
+
+    def _key_boot(self, key):
+        # # key skips boot video
+        if key == '#':
+            self.sm.dispatch("skip")
+
+    def _key_pin_type_select(self, key):
+        sm = self.sm
+        if key in ['1', '2', '3']:
+            self.input_buffer = key
+        elif key == '#':
+            if self.input_buffer == '1':
+                sm.pin_mode = 1
+                sm.dispatch("static_pin")
+            elif self.input_buffer in ['2', '3']:
+                sm.pin_mode = int(self.input_buffer)
+                sm.dispatch("dynamic_pin")
+            self.input_buffer = ""
+        elif key == '*':
+            self.input_buffer = ""
+
+    def _key_player_registration(self, key):
+        sm = self.sm
+        if key.isdigit():
+            self.input_buffer += key
+        elif key == '#':
+            if self.input_buffer == config.PLAYERS_CLEAR_CODE:
+                # The list is kept across rounds and restarts; this starts a new event
+                sm.players.clear()
+                self._show_message("PLAYERS CLEARED", 1.0)
+                self.input_buffer = ""
+            elif self.input_buffer:
+                try:
+                    sm.players.add(self.input_buffer)
+                except RegistrationError as e:
+                    self._show_message(str(e), 1.0)
+                self.input_buffer = ""
+            else:
+                self._show_message("INPUT PHONE", 1.0)
+        elif key == '*':
+            # Request says: press * to enter config that exists today
+            sm.dispatch("done")
+
+    def _key_config(self, key):
+        sm = self.sm
+        if key.isdigit():
+            self.input_buffer += key
+        elif key == '*':
+            self.input_buffer = "" # Clear
+        elif key == '#':
+            # Confirm
+            val = int(self.input_buffer) if self.input_buffer else 0
+            if self.config_step == 0: # Plant Time
+                sm.plant_time = val
+                self.config_step = 1
+                self.input_buffer = "" # Clear for next step per request
+            elif self.config_step == 1: # Defuse Time
+                sm.defuse_time = val
+                self.config_step = 2
+                self.input_buffer = "" # Clear for next step per request
+            else: # Config Done / Ready
+                sm.dispatch("confirm")
+
+    def _key_ready(self, key):
+        if key == '*':
+            self.sm.dispatch("start")
+
+    def _key_plant(self, key):
+        sm = self.sm
+        # "To arm ... press *, screen ask for arm pin"
+        if not self.showing_input:
+            if key == '*':
+                self.showing_input = True
+                self.input_buffer = ""
+        elif key.isdigit():
+            if len(self.input_buffer) < 4:
+                self.input_buffer += key
+        elif key == '#': # User must press # to confirm
+            # In dynamic mode, user SETS the pin when planting:
+            # "If the game is in dynamic pin, on plant phase,
+            # user will press * and define a 4 digit pin, show this set on console please."
+            if sm.pin_mode in [2, 3]:
+                if len(self.input_buffer) == 4:
+                    sm.dynamic_pin = self.input_buffer
+                    console.write(f"[DYNAMIC PIN] SET TO: {sm.dynamic_pin}")
+                    sm.dispatch("armed")
+                else:
+                    self._reject("4 DIGITS REQ")
+            else:
+                # Static mode
+                if self.input_buffer == config.ARM_PIN:
+                    sm.dispatch("armed")
+                else:
+                    self._record(WRONG_PIN)
+                    self._reject("WRONG CODE")
+        elif key == '*': # Cancel input?
+            self.showing_input = False
+            self.input_buffer = ""
+
+    def _key_defuse(self, key):
+        sm = self.sm
+        # "To defuse ... press *, screen ask for pin"
+        if not self.showing_input:
+            if key == '*':
+                self.showing_input = True
+                self.input_buffer = ""
+                if sm.pin_mode in [2, 3]:
+                    self.defuse_step = 0 # Ask for Phone
+                else:
+                    self.defuse_step = 1 # Ask for PIN directly
+        elif key.isdigit():
+            self.input_buffer += key
+        elif key == '#': # Confirm
+            if sm.pin_mode in [2, 3]:
+                if self.defuse_step == 0:
+                    # stage: Ask for Phone
+                    if self.input_buffer in sm.players:
+                        self._reveal_pin()
+                    else:
+                        self._record(WRONG_PHONE)
+                        self._reject("WRONG PHONE")
+                else:
+                    # stage: Ask for PIN
+                    self._try_defuse(sm.dynamic_pin)
+            else:
+                # Static mode
+                self._try_defuse(config.DEFUSE_PIN)
+        elif key == '*': # Cancel
+            self.showing_input = False
+            self.input_buffer = ""
+
+    def _key_end(self, key):
+        if key == '#':
+            # Short press -> Ready
+            self.sm.dispatch("restart")
+
+    def _reveal_pin(self):
+        sm = self.sm
+        sm.players.record_reveal(self.input_buffer)
+        self._record(REVEAL)
+        sm.log("SYSTEM BREACH DETECTED")
+        sm.log("BYPASSING ENCRYPTION...")
+        sm.log("EXPLOITING BUFFER OVERFLOW...")
+        sm.log("EXTRACTING MASTER PIN...")
+        sm.log(f"PIN REVEALED: {sm.dynamic_pin}")
+
+        # Show overlay like a "software glitch"
+        sm.show_console = True
+
+        # Mode 3: Send Telegram on Reveal
+        if sm.pin_mode == 3:
+            msg_counterterrorists = f"PIN FOR DEFUSE: {sm.dynamic_pin}"
+            # The PIN also goes to the player whose phone was entered
+            self._telegram().broadcast([self.tg_chat_id_counterterrorists, sm.players.chat_id(self.input_buffer)], msg_counterterrorists)
+            msg_terrorists = "DEFUSE IN PROGRESS..."
+            self._telegram().broadcast([self.tg_chat_id_terrorists], msg_terrorists)
+
+        self._show_message("PHONE OK", 1.0)
+        self.input_buffer = ""
+        self.defuse_step = 1 # Now ask for PIN
+
+    def _record(self, kind):
+        if self.telemetry is not None:
+            self.telemetry.record(kind, self.sm.state.value)
+
+    def _reject(self, message):
+        """Wrong entry: show message for 2s and close the input field"""
+        self._show_message(message, 2.0)
+        self.input_buffer = ""
+        self.showing_input = False
+
+    def _try_defuse(self, pin):
+        if self.input_buffer == pin:
+            self.sm.dispatch("defused")
+        else:
+            self._record(WRONG_PIN)
+            self._reject("WRONG CODE")
+
+    def next_event_in(self):
+        """
+        Upper bound on the seconds until step() may do anything besides
+        counting timers down (a beep, a blink, a timeout, a message expiring).
+        Lets a simulator skip quiet stretches in one step.
+        """
+        sm = self.sm
+        deadlines = []
+        if '#' in self.current_keys:
+            deadlines.append(2.0 - self.hash_hold_time)
+        if self.message_timer > 0:
+            deadlines.append(self.message_timer)
+        if sm.state == GameState.BOOT and not self.has_boot_video:
+            return 0.0
+        if sm.state in COUNTDOWN_STATES:
+            timer = sm.current_timer  # Reads the clock: once
+            deadlines.append(timer)
+            if self.cues is not None:
+                deadlines.append(self.cues.next_in(timer))
+        elif sm.state in END_STATES:
+            deadlines.append(0.5 - self.blink_timer)
+        return max(0.0, min(deadlines)) if deadlines else float("inf")
+
+    def labels(self):
+        """(display_input, input_label) for the current screen"""
+        sm = self.sm
+        display_input = ""
+        current_label = "" # Unused on screens without input
+
+        if sm.state == GameState.PIN_TYPE_SELECT:
+            current_label = "SELECT PIN TYPE (1:STAT, 2:DYN, 3:TG)"
+            display_input = self.input_buffer
+        elif sm.state == GameState.PLAYER_REGISTRATION:
+            current_label = f"PLAYER {len(sm.players) + 1} PHONE"
+            display_input = self.input_buffer
+        elif sm.state == GameState.CONFIG:
+            # Determine Context Label
+            if self.config_step == 0:
+                current_label = "SET PLANT TIME"
+            elif self.config_step == 1:
+                current_label = "SET DEFUSE TIME"
+            elif self.config_step == 2:
+                current_label = "CONFIG DONE"
+            display_input = self.input_buffer
+        elif sm.state == GameState.DEFUSE_PHASE:
+            if not self.showing_input:
+                if sm.pin_mode in [2, 3]:
+                    current_label = "PRESS * TO PUT PHONE"
+                else:
+                    current_label = "PRESS * TO ENTER PIN"
+            elif sm.pin_mode in [2, 3] and self.defuse_step == 0:
+                current_label = "PRESS # IN THE END"
+                display_input = self.input_buffer
+            else:
+                # Masking for PIN
+                display_input = self._masked_input()
+                current_label = "INSERT PIN" if sm.pin_mode in [2, 3] else "CODE"
+        elif sm.state == GameState.PLANT_PHASE:
+            if self.showing_input:
+                display_input = self._masked_input()
+                current_label = "CODE"
+
+        return display_input, current_label
+
+    def _masked_input(self):
+        mask_count = max(0, 4 - len(self.input_buffer))
+        return self.input_buffer + ('*' * mask_count)
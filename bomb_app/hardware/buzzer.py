@@ -0,0 +1,71 @@
+import queue
+import threading
+from .. import config
+
+
+class BuzzerDriver:
+    """
+    Plays beep patterns on a dedicated thread so beeping never blocks the game loop.
+    A pattern is (duration_ms, gap_ms, repeat); patterns queue up and play in order.
+    set_output(True/False) drives the buzzer pin.
+    """
+    def __init__(self, set_output, queue_size=None):
+        self._set_output = set_output
+        self._patterns = queue.Queue(maxsize=queue_size or config.BUZZER_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by cancel(), older patterns are skipped
+        self._cancelled = threading.Event()  # Interrupts the pattern being played
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="buzzer", daemon=True)
+            self._thread.start()
+
+    def play(self, duration_ms, gap_ms=0, repeat=1, replace=False):
+        """Queue a pattern and return immediately. replace=True cancels what is playing/queued first"""
+        with self._lock:
+            if replace:
+                self._cancel_locked()
+            generation = self._generation
+        try:
+            self._patterns.put_nowait((generation, duration_ms, gap_ms, repeat))
+        except queue.Full:
+            pass  # Backlog of beeps, drop this one rather than block
+
+    def cancel(self):
+        """Silence the buzzer and drop queued patterns"""
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._generation += 1
+        self._cancelled.set()
+
+    def stop(self):
+        """Cancel everything and end the thread"""
+        self.cancel()
+        if self._thread is not None:
+            self._patterns.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            pattern = self._patterns.get()
+            if pattern is None:
+                break
+            generation, duration_ms, gap_ms, repeat = pattern
+            with self._lock:
+                if generation != self._generation:
+                    continue  # Cancelled while queued
+                self._cancelled.clear()
+
+            for i in range(repeat):
+                self._set_output(True)
+                interrupted = self._cancelled.wait(duration_ms / 1000.0)
+                self._set_output(False)
+                if interrupted:
+                    break
+                if i < repeat - 1 and gap_ms > 0 and self._cancelled.wait(gap_ms / 1000.0):
+                    break
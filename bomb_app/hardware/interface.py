@@ -16,9 +16,26 @@ class HardwareInterface(ABC):
 
     @abstractmethod
     def beep(self, duration_ms):
+        """Start a single beep and return immediately"""
+        pass
+
+    @abstractmethod
+    def beep_pattern(self, duration_ms, gap_ms=0, repeat=1, replace=False):
+        """Queue repeat beeps of duration_ms separated by gap_ms, without blocking.
+        replace=True cancels whatever is playing or queued first"""
+        pass
+
+    @abstractmethod
+    def cancel_beep(self):
+        """Silence the buzzer and drop queued beeps"""
         pass
 
     @abstractmethod
     def get_pressed_keys(self):
         """Return a list of keys currently being held down. Keys: '0'-'9', '*', '#'"""
         pass
+
+    @abstractmethod
+    def get_key_events(self):
+        """Return the KeyEvents (key, pressed, timestamp) since the last call, oldest first"""
+        pass
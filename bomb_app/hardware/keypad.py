@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import deque, namedtuple
+from .. import config
+
+# pressed: True on press, False on release. timestamp: time.monotonic() of the first raw change
+KeyEvent = namedtuple("KeyEvent", ["key", "pressed", "timestamp"])
+
+
+class KeyDebouncer:
+    """
+    Per-key debounce state machine.
+    A key changes state only after its raw reading has differed from the
+    stable state for debounce_ms without interruption, so contact bounce
+    never turns into double presses.
+    """
+    def __init__(self, keys, debounce_ms=None):
+        if debounce_ms is None:
+            debounce_ms = config.KEYPAD_DEBOUNCE_MS
+        self.debounce = debounce_ms / 1000.0
+        self.stable = {key: False for key in keys}
+        self.changed_since = {key: None for key in keys}  # Start of a pending change
+
+    def update(self, raw_pressed, now):
+        """Feed one scan (set of raw pressed keys), return the KeyEvents it settles"""
+        events = []
+        for key, stable in self.stable.items():
+            raw = key in raw_pressed
+            if raw == stable:
+                self.changed_since[key] = None  # Bounced back, cancel pending change
+                continue
+            since = self.changed_since[key]
+            if since is None:
+                self.changed_since[key] = now
+            elif now - since >= self.debounce:
+                self.stable[key] = raw
+                self.changed_since[key] = None
+                events.append(KeyEvent(key, raw, since))
+        return events
+
+    def pressed_keys(self):
+        return [key for key, stable in self.stable.items() if stable]
+
+
+class KeypadScanner:
+    """
+    Scans the keypad on a background thread at scan_hz and publishes
+    debounced KeyEvents to a deque. The game loop drains it with get_events();
+    deque append/popleft are atomic, so neither side takes a lock.
+    """
+    def __init__(self, scan, keys, scan_hz=None, debounce_ms=None):
+        self._scan = scan  # Returns the set of raw pressed keys
+        self._period = 1.0 / (scan_hz or config.KEYPAD_SCAN_HZ)
+        self.debouncer = KeyDebouncer(keys, debounce_ms)
+        self._events = deque(maxlen=config.KEYPAD_EVENT_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="keypad", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        next_scan = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for event in self.debouncer.update(self._scan(), now):
+                self._events.append(event)
+            # Fixed-rate schedule; skip ahead instead of bursting if we fell behind
+            next_scan = max(next_scan + self._period, now)
+            self._stop.wait(next_scan - time.monotonic())
+
+    def get_events(self):
+        """Pop all events published since the last call, oldest first"""
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def pressed_keys(self):
+        return self.debouncer.pressed_keys()
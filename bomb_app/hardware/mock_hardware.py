@@ -1,14 +1,21 @@
 from .interface import HardwareInterface
+from .buzzer import BuzzerDriver
+from .keypad import KeyEvent
+from collections import deque
 import time
 
 class MockHardware(HardwareInterface):
     def __init__(self):
         self.held_keys = set()
+        self.key_events = deque()
+        self.buzzer = BuzzerDriver(lambda on: None)  # Same timing as the real buzzer, no pin
         
     def initialize(self):
+        self.buzzer.start()
         print("[MockHW] Initialized")
 
     def cleanup(self):
+        self.buzzer.stop()
         print("[MockHW] Cleanup")
 
     def set_led(self, led_name, state):
@@ -17,13 +24,29 @@ class MockHardware(HardwareInterface):
 
     def beep(self, duration_ms):
         print(f"[MockHW] BEEP for {duration_ms}ms")
+        self.buzzer.play(duration_ms)
+
+    def beep_pattern(self, duration_ms, gap_ms=0, repeat=1, replace=False):
+        print(f"[MockHW] BEEP {repeat}x {duration_ms}ms (gap {gap_ms}ms)")
+        self.buzzer.play(duration_ms, gap_ms, repeat, replace)
+
+    def cancel_beep(self):
+        self.buzzer.cancel()
 
     def get_pressed_keys(self):
         return list(self.held_keys)
 
+    def get_key_events(self):
+        events = list(self.key_events)
+        self.key_events.clear()
+        return events
+
     def set_key_state(self, key, is_down):
         """Helper for PC simulation"""
+        if is_down == (key in self.held_keys):
+            return  # Key repeat, not a new press
         if is_down:
             self.held_keys.add(key)
         else:
             self.held_keys.discard(key)
+        self.key_events.append(KeyEvent(key, is_down, time.monotonic()))
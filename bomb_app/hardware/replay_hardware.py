@@ -0,0 +1,97 @@
+from .interface import HardwareInterface
+from .keypad import KeyEvent
+from .. import config
+from ..clock import ReplayClock
+from ..state_machine import GameState
+from ..telemetry import read_session, KEY, STATE, CLOCK, SETUP, TIMEOUT
+from collections import deque
+
+class ReplayHardware(HardwareInterface):
+    """
+    Plays back the key events of a recorded telemetry session.
+
+    The replay loop calls advance(t, deadline) before each logic step; the
+    keys the recording handed to that step are then returned by
+    get_key_events(), and clock moves to the step with the countdown drift
+    recorded for it. The countdown runs out on the recorded step, whatever
+    sub-step jitter the recording's real clock had. Beeps are counted, not
+    played.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = read_session(path)
+        self.clock = ReplayClock()
+        self.held_keys = set()
+        self.key_events = deque()
+        self.beeps = 0
+        self._next = 0  # First record not played yet
+
+        self.logic_hz = config.LOGIC_HZ
+        self.has_boot_video = False
+        for t, kind, code, extra, timer_ms in self.records:
+            if kind == SETUP:
+                self.logic_hz = extra
+                self.has_boot_video = bool(code)
+                break
+        # (game time, state entered), in recorded order
+        self.states = [(t, GameState(code)) for t, kind, code, extra, timer_ms in self.records if kind == STATE]
+        self.end_time = self.records[-1][0] if self.records else 0.0
+
+    @property
+    def done(self):
+        return self._next >= len(self.records)
+
+    def advance(self, t, deadline_ns=None):
+        """Play the records of the logic step that ends at game time t (deadline_ns: the running countdown's)"""
+        records = self.records
+        clock = self.clock
+        clock.step_ns = round(t * 1e9)
+        timeout = False
+        while self._next < len(records) and records[self._next][0] <= t + 1e-6:
+            at, kind, code, extra, timer_ms = records[self._next]
+            self._next += 1
+            if kind == KEY:
+                key, pressed = chr(code), extra == 1
+                if pressed:
+                    self.held_keys.add(key)
+                else:
+                    self.held_keys.discard(key)
+                self.key_events.append(KeyEvent(key, pressed, at))
+            elif kind == CLOCK:
+                clock.offset_ns = timer_ms * 1000
+            elif kind == TIMEOUT:
+                timeout = True
+            elif kind == SETUP:
+                self.has_boot_video = bool(code)
+        if deadline_ns is not None:
+            now = clock.now_ns()
+            if timeout and now < deadline_ns:
+                clock.offset_ns += deadline_ns - now  # Ran out here in the recording
+            elif not timeout and now >= deadline_ns:
+                clock.offset_ns -= now - deadline_ns + 1  # Didn't run out yet in the recording
+
+    def initialize(self):
+        print(f"[ReplayHW] {len(self.records)} records from {self.path} ({self.logic_hz} steps/s)")
+
+    def cleanup(self):
+        print(f"[ReplayHW] Cleanup ({self.beeps} beeps)")
+
+    def set_led(self, led_name, state):
+        pass
+
+    def beep(self, duration_ms):
+        self.beeps += 1
+
+    def beep_pattern(self, duration_ms, gap_ms=0, repeat=1, replace=False):
+        self.beeps += repeat
+
+    def cancel_beep(self):
+        pass
+
+    def get_pressed_keys(self):
+        return list(self.held_keys)
+
+    def get_key_events(self):
+        events = list(self.key_events)
+        self.key_events.clear()
+        return events
@@ -1,9 +1,10 @@
 from .interface import HardwareInterface
+from .buzzer import BuzzerDriver
+from .keypad import KeypadScanner
 try:
     import RPi.GPIO as GPIO
 except ImportError:
     GPIO = None
-import time
 from .. import config
 
 class RpiHardware(HardwareInterface):
@@ -16,6 +17,8 @@ class RpiHardware(HardwareInterface):
             ['7', '8', '9'],
             ['*', '0', '#']
         ]
+        self.buzzer = BuzzerDriver(self._set_buzzer)
+        self.keypad = KeypadScanner(self._scan_matrix, [key for row in self.matrix for key in row])
         
     def initialize(self):
         if GPIO is None:
@@ -28,16 +31,21 @@ class RpiHardware(HardwareInterface):
         GPIO.setup(config.PIN_LED_RED, GPIO.OUT)
         GPIO.setup(config.PIN_LED_GREEN, GPIO.OUT)
         GPIO.setup(config.PIN_BUZZER, GPIO.OUT)  # Active buzzer?
+        self.buzzer.start()
         
-        # Keypad
+        # Keypad (columns idle low, driven high one at a time while scanning)
         for col in self.cols:
             GPIO.setup(col, GPIO.OUT)
-            GPIO.output(col, 1)
+            GPIO.output(col, 0)
             
         for row in self.rows:
             GPIO.setup(row, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
 
+        self.keypad.start()
+
     def cleanup(self):
+        self.keypad.stop()
+        self.buzzer.stop()
         if GPIO:
             GPIO.cleanup()
 
@@ -46,22 +54,36 @@ class RpiHardware(HardwareInterface):
         pin = config.PIN_LED_RED if led_name == 'RED' else config.PIN_LED_GREEN
         GPIO.output(pin, 1 if state else 0)
 
+    def _set_buzzer(self, on):
+        GPIO.output(config.PIN_BUZZER, 1 if on else 0)
+
     def beep(self, duration_ms):
+        self.beep_pattern(duration_ms)
+
+    def beep_pattern(self, duration_ms, gap_ms=0, repeat=1, replace=False):
         if GPIO is None: return
-        GPIO.output(config.PIN_BUZZER, 1)
-        # Note: This is blocking, might want to make it non-blocking in a real loop
-        # For now, simplistic.
-        time.sleep(duration_ms / 1000.0)
-        GPIO.output(config.PIN_BUZZER, 0)
+        # Timed on the buzzer thread, the game loop never sleeps here
+        self.buzzer.play(duration_ms, gap_ms, repeat, replace)
 
-    def get_pressed_keys(self):
-        if GPIO is None: return []
-        
-        pressed = []
+    def cancel_beep(self):
+        if GPIO is None: return
+        self.buzzer.cancel()
+
+    def _scan_matrix(self):
+        """Raw (undebounced) set of pressed keys, called from the keypad thread"""
+        pressed = set()
         for j, col in enumerate(self.cols):
             GPIO.output(col, 1)
             for i, row in enumerate(self.rows):
                 if GPIO.input(row) == 1:
-                    pressed.append(self.matrix[i][j])
+                    pressed.add(self.matrix[i][j])
             GPIO.output(col, 0)
         return pressed
+
+    def get_pressed_keys(self):
+        if GPIO is None: return []
+        return self.keypad.pressed_keys()
+
+    def get_key_events(self):
+        if GPIO is None: return []
+        return self.keypad.get_events()
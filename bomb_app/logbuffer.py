@@ -0,0 +1,85 @@
+import atexit
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+# One console log line
+LogRecord = namedtuple("LogRecord", ["time", "level", "message"])
+
+
+class LogBuffer:
+    """
+    The last capacity log records, in a fixed-size ring (deque with maxlen):
+    appending never copies or reallocates. Readers iterate it in place.
+    count keeps growing, so it changes with every record even once full.
+    """
+    def __init__(self, capacity):
+        self._records = deque(maxlen=capacity)
+        self.count = 0  # Records appended so far
+
+    def append(self, level, message):
+        record = LogRecord(time.time(), level, message)
+        self._records.append(record)
+        self.count += 1
+        return record
+
+    def clear(self):
+        self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+
+class ConsolePrinter:
+    """
+    Writes lines to stdout from a background thread, so the game loop never
+    waits on a slow terminal (serial console, SSH). Lines keep their order.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def write(self, line):
+        if self._thread is None:
+            self._start()
+        self._queue.put(line)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="console", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            try:
+                if line is None:
+                    return
+                print(line)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every line written so far is printed"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Print what is queued and stop the thread (write() starts it again)"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+# Shared by everything that logs to the console
+console = ConsolePrinter()
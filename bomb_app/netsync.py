@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from . import config
+
+PROTOCOL = 1
+
+
+class PeerClock:
+    """
+    Offset of a peer's monotonic clock from ours, estimated NTP-style from
+    ping/pong round trips. The sample with the shortest round trip wins,
+    as it had the least room for queueing delay.
+    """
+    def __init__(self, samples=8):
+        self.samples = deque(maxlen=samples)  # (rtt_ns, offset_ns)
+
+    def add(self, t0, t1, t2, t3):
+        """t0/t3: ping sent/pong received here, t1/t2: ping received/pong sent by the peer"""
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) // 2
+        self.samples.append((rtt, offset))
+
+    @property
+    def known(self):
+        return bool(self.samples)
+
+    @property
+    def rtt_ns(self):
+        return min(self.samples)[0] if self.samples else None
+
+    @property
+    def offset_ns(self):
+        return min(self.samples)[1] if self.samples else 0
+
+    def to_local(self, peer_ns):
+        return peer_ns - self.offset_ns
+
+    def to_peer(self, local_ns):
+        return local_ns + self.offset_ns
+
+
+class Peer:
+    """Last known view of another device"""
+    def __init__(self, device_id, epoch):
+        self.device_id = device_id
+        self.epoch = epoch  # Changes when the device restarts
+        self.seq = 0  # Highest sequence number seen from this epoch
+        self.address = None
+        self.clock = PeerClock()
+        self.state = None
+        self.event = None
+        self.deadline_ns = None  # Countdown deadline on our clock, None when not counting
+        self.last_seen_ns = 0
+
+    def remaining_ms(self, now_ns):
+        if self.deadline_ns is None:
+            return None
+        return max(0, self.deadline_ns - now_ns) // 1000000
+
+
+class NetSync:
+    """
+    Round coordination between props (and a field controller) over UDP.
+
+    Every device multicasts small JSON datagrams to NETSYNC_GROUP (or sends
+    them to an explicit peer list): its state, countdown and the event that
+    caused each change, heartbeats, clock pings, and commands. Each datagram
+    carries (device, epoch, seq): older or repeated ones are dropped, so
+    commands can be sent several times to survive packet loss. Received
+    commands wait in a queue until the game loop calls update(), which keeps
+    the engine single threaded.
+    """
+    def __init__(self, device_id=None, group=None, port=None, peers=None, bind_port=None, now_ns=time.monotonic_ns):
+        self.device_id = device_id or config.NETSYNC_DEVICE_ID or socket.gethostname()
+        self.epoch = os.urandom(4).hex()
+        self.group = group or config.NETSYNC_GROUP
+        self.port = port or config.NETSYNC_PORT
+        self.peer_addresses = peers if peers is not None else list(config.NETSYNC_PEERS)
+        self.bind_port = bind_port or self.port
+        self.now_ns = now_ns
+        self.peers = {}  # Added to by the receiver thread: iterate over peer_list()
+        self._peers_lock = threading.Lock()
+        self.commands = queue.Queue()
+        self._seq = 0
+        self._send_lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._running = False
+        self._next_heartbeat = 0
+        self._pending = []  # (local ns due, event) commands waiting for their start time
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            # Several processes on one host (tests, a controller next to a prop)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.bind_port))
+        if self.peer_addresses:
+            self._targets = [tuple(address) for address in self.peer_addresses]
+        else:
+            membership = struct.pack("4s4s", socket.inet_aton(self.group), socket.inet_aton("0.0.0.0"))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)  # Stay on the LAN
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            self._targets = [(self.group, self.port)]
+        sock.settimeout(0.2)  # Lets close() stop the receiver
+        self._sock = sock
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="netsync", daemon=True)
+        self._thread.start()
+        print(f"[NETSYNC] {self.device_id} on {self._targets}")
+
+    def close(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    # --- Sending ---
+
+    def _send(self, kind, repeat=1, **fields):
+        if self._sock is None:
+            return
+        with self._send_lock:
+            self._seq += 1
+            message = {"v": PROTOCOL, "dev": self.device_id, "ep": self.epoch, "seq": self._seq,
+                       "type": kind, "t": self.now_ns()}
+            message.update(fields)
+            data = json.dumps(message, separators=(",", ":")).encode()
+            for _ in range(repeat):
+                for address in self._targets:
+                    try:
+                        self._sock.sendto(data, address)
+                    except OSError as e:
+                        print(f"[NETSYNC] Send to {address} failed: {e}")
+
+    def publish(self, sm):
+        """Broadcast the state, countdown and the event behind the last change"""
+        self._send("state", state=sm.state.name, event=sm.last_event,
+                   remaining_ms=sm.remaining_ms() if sm.counting else None)
+
+    def ping(self):
+        self._send("ping")
+
+    def command(self, event, delay=0.0, target=None):
+        """
+        Ask the props (or only target) to apply event in delay seconds.
+        Props whose clock offset is known get the start time on their own
+        clock, so they all act on the same instant.
+        """
+        now = self.now_ns()
+        delay_ns = round(delay * 1e9)
+        at = {device_id: peer.clock.to_peer(now + delay_ns)
+              for device_id, peer in self.peer_list() if peer.clock.known}
+        self._send("cmd", repeat=config.NETSYNC_COMMAND_REPEAT, event=event, target=target,
+                   delay_ns=delay_ns, at=at)
+
+    def peer_list(self):
+        """Snapshot of (device_id, Peer), safe while the receiver thread adds peers"""
+        with self._peers_lock:
+            return list(self.peers.items())
+
+    # --- Receiving ---
+
+    def _run(self):
+        while self._running:
+            try:
+                data, address = self._sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received = self.now_ns()
+            try:
+                message = json.loads(data)
+                if message.get("v") != PROTOCOL:
+                    continue
+                self._handle(message, address, received)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[NETSYNC] Bad datagram from {address}: {e}")
+
+    def _handle(self, message, address, received):
+        device_id, epoch = message["dev"], message["ep"]
+        if device_id == self.device_id and epoch == self.epoch:
+            return  # Our own multicast, looped back
+        peer = self.peers.get(device_id)
+        if peer is None or peer.epoch != epoch:
+            peer = Peer(device_id, epoch)  # New device, or it restarted
+            with self._peers_lock:
+                self.peers[device_id] = peer
+        if message["seq"] <= peer.seq:
+            return  # Duplicate or overtaken by a newer datagram
+        peer.seq = message["seq"]
+        peer.address = address
+        peer.last_seen_ns = received
+
+        kind = message["type"]
+        if kind == "ping":
+            self._send("pong", to=device_id, t0=message["t"], t1=received)
+        elif kind == "pong":
+            if message["to"] == self.device_id:
+                peer.clock.add(message["t0"], message["t1"], message["t"], received)
+        elif kind == "state":
+            peer.state = message["state"]
+            peer.event = message["event"]
+            remaining_ms = message["remaining_ms"]
+            if remaining_ms is None:
+                peer.deadline_ns = None
+            elif peer.clock.known:
+                peer.deadline_ns = peer.clock.to_local(message["t"]) + remaining_ms * 1000000
+            else:
+                peer.deadline_ns = received + remaining_ms * 1000000
+        elif kind == "cmd":
+            if message["target"] in (None, self.device_id):
+                at = message["at"].get(self.device_id)
+                if at is None:
+                    # Sender doesn't know our clock yet: count the delay from arrival
+                    at = received + message["delay_ns"]
+                self.commands.put((at, message["event"], device_id))
+
+    # --- Game loop side ---
+
+    def attach(self, sm):
+        """Publish every state change of sm as it happens"""
+        for state in type(sm.state):
+            # Per state, so it runs after the hook that starts the countdown
+            sm.on_enter(state, lambda: self.publish(sm))
+
+    def update(self, sm):
+        """Apply due commands to sm and send heartbeats; call once per logic step"""
+        while True:
+            try:
+                self._pending.append(self.commands.get_nowait())
+            except queue.Empty:
+                break
+        now = self.now_ns()
+        if self._pending:
+            due = [command for command in self._pending if command[0] <= now]
+            self._pending = [command for command in self._pending if command[0] > now]
+            for _, event, sender in sorted(due):
+                if event not in config.NETSYNC_REMOTE_EVENTS:
+                    print(f"[NETSYNC] Ignored {event!r} from {sender}")
+                elif sm.dispatch(event):
+                    print(f"[NETSYNC] {event} from {sender}")
+        if now >= self._next_heartbeat:
+            self._next_heartbeat = now + round(config.NETSYNC_HEARTBEAT * 1e9)
+            self.publish(sm)
+            self.ping()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Field controller for props running with NETSYNC_ENABLED")
+    parser.add_argument("command", choices=["status"] + list(config.NETSYNC_REMOTE_EVENTS))
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds until the props act (same instant on all)")
+    parser.add_argument("--target", help="Only this device ID")
+    parser.add_argument("--listen", type=float, default=1.0, help="Seconds spent finding the props first")
+    args = parser.parse_args(argv)
+
+    sync = NetSync(device_id=f"controller-{socket.gethostname()}-{os.getpid()}")
+    sync.start()
+    try:
+        # Learn the props and their clock offsets (they answer pings)
+        end = time.monotonic() + args.listen
+        while time.monotonic() < end:
+            sync.ping()
+            time.sleep(0.1)
+        if args.command != "status":
+            sync.command(args.command, args.delay, args.target)
+            time.sleep(args.delay + 0.3)  # Props publish their new state
+
+        now = sync.now_ns()
+        print(f"{'device':24s}{'state':16s}{'left ms':>10s}{'rtt ms':>8s}{'offset ms':>11s}")
+        for device_id, peer in sorted(sync.peer_list()):
+            if device_id.startswith("controller-"):
+                continue
+            remaining = peer.remaining_ms(now)
+            rtt = peer.clock.rtt_ns
+            print(f"{device_id:24s}{str(peer.state):16s}{'-' if remaining is None else remaining:>10}"
+                  f"{'-' if rtt is None else f'{rtt / 1e6:.2f}':>8s}{peer.clock.offset_ns / 1e6:11.2f}")
+    finally:
+        sync.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
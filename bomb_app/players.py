@@ -0,0 +1,229 @@
+import argparse
+import atexit
+import os
+import queue
+import shutil
+import threading
+from . import config
+from .telegram_config import TELEGRAM_PLAYER_CHAT_IDS
+
+FILE_HEADER = "# bomb players v1: phone, team, chat id, reveals\n"
+
+
+class RegistrationError(ValueError):
+    """Phone refused by the registry; the message is shown on screen"""
+
+
+def normalise(phone):
+    """Digits only, without the leading zeros of trunk/international prefixes"""
+    return "".join(c for c in str(phone) if c.isdigit()).lstrip("0")
+
+
+class Player:
+    __slots__ = ("phone", "team", "chat_id", "reveals")
+
+    def __init__(self, phone, team=None, chat_id=None, reveals=0):
+        self.phone = phone
+        self.team = team or config.PLAYERS_DEFAULT_TEAM
+        self.chat_id = chat_id
+        self.reveals = reveals  # Times this phone got the defuse PIN
+
+
+class PlayerRegistry:
+    """
+    Registered players, indexed by normalised phone number (O(1) lookups).
+
+    Iterates in registration order. With a path, every registration is
+    saved right away, so a power cycle keeps the list; reveal counts are
+    saved by flush() (at the end of a round). Saving only snapshots the
+    list: a writer thread puts it on disk, so the game loop never waits
+    for the SD card.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._players = {}  # Normalised phone -> Player
+        self._dirty = False  # Reveal counts not saved yet
+        self._writes = queue.Queue()  # Snapshots (lists of lines) for the writer thread
+        self._thread = None
+        self._lock = threading.Lock()
+        # Chat IDs from TELEGRAM_PLAYER_CHAT_IDS, keyed the same way
+        self._chat_ids = {normalise(phone): chat_id for phone, chat_id in TELEGRAM_PLAYER_CHAT_IDS.items()}
+
+    def __len__(self):
+        return len(self._players)
+
+    def __iter__(self):
+        return iter(self._players.values())
+
+    def __contains__(self, phone):
+        return normalise(phone) in self._players
+
+    def get(self, phone):
+        return self._players.get(normalise(phone))
+
+    def add(self, phone, team=None, chat_id=None):
+        """Register phone, raising RegistrationError if it is invalid, taken or the registry is full"""
+        key = normalise(phone)
+        if len(key) < config.PLAYERS_MIN_DIGITS:
+            raise RegistrationError("INVALID PHONE")
+        if key in self._players:
+            raise RegistrationError("ALREADY REGISTERED")
+        if len(self._players) >= config.PLAYERS_MAX:
+            raise RegistrationError("REGISTRY FULL")
+        player = Player(key, team, chat_id or self._chat_ids.get(key))
+        self._players[key] = player
+        self.save()
+        return player
+
+    def remove(self, phone):
+        if self._players.pop(normalise(phone), None) is None:
+            return False
+        self.save()
+        return True
+
+    def clear(self):
+        self._players.clear()
+        self.save()
+
+    def record_reveal(self, phone):
+        player = self.get(phone)
+        if player is not None:
+            player.reveals += 1
+            self._dirty = True
+        return player
+
+    def chat_id(self, phone):
+        player = self.get(phone)
+        return player.chat_id if player is not None else self._chat_ids.get(normalise(phone))
+
+    def chat_ids(self):
+        return [player.chat_id for player in self._players.values()]
+
+    def load(self):
+        """
+        Read the players saved at path (missing file: no players).
+        Malformed lines are skipped; the file as read is kept next to it as
+        path.bad, so the next save doesn't lose them for good.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return self
+        players = {}
+        bad_lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("#") or not line.strip():
+                        continue
+                    try:
+                        phone, team, chat_id, reveals = line.rstrip("\n").split("\t")
+                        players[phone] = Player(phone, team, chat_id or self._chat_ids.get(phone), int(reveals))
+                    except ValueError:
+                        bad_lines += 1
+            if bad_lines:
+                shutil.copyfile(self.path, self.path + ".bad")
+                print(f"[WARNING] Skipped {bad_lines} malformed line(s) in {self.path}, original kept as {self.path}.bad")
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"[WARNING] Could not read players from {self.path}: {e}; registrations will not be saved")
+            self.path = None  # Don't overwrite a file we couldn't read
+            return self
+        self._players = players
+        print(f"[INFO] {len(players)} registered player(s) loaded from {self.path}")
+        return self
+
+    def flush(self):
+        """Save if anything changed since the last save"""
+        if self._dirty:
+            self.save()
+
+    def save(self):
+        """Queue a snapshot of all players to be written to path"""
+        self._dirty = False
+        if not self.path:
+            return
+        lines = [f"{p.phone}\t{p.team}\t{p.chat_id or ''}\t{p.reveals}\n" for p in self._players.values()]
+        if self._thread is None:
+            self._start()
+        self._writes.put(lines)
+
+    def wait(self):
+        """Block until every save queued so far is on disk"""
+        if self._thread is not None:
+            self._writes.join()
+
+    def close(self):
+        """Write what is queued and stop the writer thread (save() starts it again)"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._writes.put(None)
+            thread.join()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="players", daemon=True)
+                self._thread.start()
+                atexit.register(self.wait)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            running = None not in batch
+            snapshots = [lines for lines in batch if lines is not None]
+            if snapshots:
+                self._write(snapshots[-1])  # Only the newest list matters
+            for _ in batch:
+                self._writes.task_done()
+
+    def _write(self, lines):
+        """Atomically: a power cut leaves the old or the new file"""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(FILE_HEADER)
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[WARNING] Could not save players to {self.path}: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the saved player registry")
+    parser.add_argument("command", choices=["list", "add", "remove", "clear"])
+    parser.add_argument("phone", nargs="?")
+    parser.add_argument("--team")
+    parser.add_argument("--chat-id")
+    parser.add_argument("--path", default=config.PLAYERS_PATH)
+    args = parser.parse_args(argv)
+
+    registry = PlayerRegistry(args.path).load()
+    if args.command == "list":
+        for player in registry:
+            print(f"{player.phone:16s}{player.team:6s}{player.chat_id or '-':>16s}{player.reveals:6d}")
+        print(f"{len(registry)} player(s)")
+    elif args.command == "clear":
+        registry.clear()
+    elif not args.phone:
+        parser.error(f"{args.command} needs a phone number")
+    elif args.command == "add":
+        try:
+            registry.add(args.phone, args.team, args.chat_id)
+        except RegistrationError as e:
+            print(e)
+            return 1
+    elif not registry.remove(args.phone):
+        print("NOT REGISTERED")
+        return 1
+    registry.close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
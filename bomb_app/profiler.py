@@ -0,0 +1,258 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from collections import deque
+from . import config
+
+# Loop phases, in the order they run in main.main
+PHASES = ["events", "poll", "tick", "buzzer", "keys", "render", "flip"]
+
+# Ring file: header, phase names, then capacity records of (timestamp, frame ms, ms per phase)
+RING_MAGIC = b"BPRF"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIQ")  # magic, version, phase count, capacity, records written
+RING_NAME = struct.Struct("<16s")
+
+
+def ring_record(phase_count):
+    return struct.Struct(f"<df{phase_count}f")
+
+
+class ProfileRing:
+    """
+    Fixed-size memory-mapped file holding the last capacity frame records.
+    Writing a record is a struct.pack_into into the mapping; the OS flushes
+    it to disk in the background, so the loop never waits on the SD card.
+    """
+    def __init__(self, path, phases, capacity):
+        self.phases = phases
+        self.capacity = capacity
+        self.record = ring_record(len(phases))
+        self.data_offset = RING_HEADER.size + RING_NAME.size * len(phases)
+        size = self.data_offset + self.record.size * capacity
+
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        RING_HEADER.pack_into(self._map, 0, RING_MAGIC, RING_VERSION, len(phases), capacity, 0)
+        for i, phase in enumerate(phases):
+            RING_NAME.pack_into(self._map, RING_HEADER.size + i * RING_NAME.size, phase.encode())
+        self.written = 0
+
+    def append(self, timestamp, frame_ms, phase_ms):
+        offset = self.data_offset + (self.written % self.capacity) * self.record.size
+        self.record.pack_into(self._map, offset, timestamp, frame_ms, *phase_ms)
+        self.written += 1
+        RING_HEADER.pack_into(self._map, 0, RING_MAGIC, RING_VERSION, len(self.phases), self.capacity, self.written)
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+def read_ring(path):
+    """Records of a ring file as (phases, [(timestamp, frame_ms, [phase ms...]), ...]), oldest first"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, phase_count, capacity, written = RING_HEADER.unpack_from(data, 0)
+    if magic != RING_MAGIC or version != RING_VERSION:
+        raise ValueError(f"Not a profile ring file: {path}")
+    phases = [RING_NAME.unpack_from(data, RING_HEADER.size + i * RING_NAME.size)[0].rstrip(b"\0").decode()
+              for i in range(phase_count)]
+    record = ring_record(phase_count)
+    data_offset = RING_HEADER.size + RING_NAME.size * phase_count
+    first = max(0, written - capacity)
+    records = []
+    for n in range(first, written):
+        values = record.unpack_from(data, data_offset + (n % capacity) * record.size)
+        records.append((values[0], values[1], list(values[2:])))
+    return phases, records
+
+
+def percentiles(samples, pcts=(50, 95, 99)):
+    ordered = sorted(samples)
+    if not ordered:
+        return [0.0] * (len(pcts) + 1)
+    last = len(ordered) - 1
+    return [ordered[min(last, int(round(p / 100.0 * last)))] for p in pcts] + [ordered[-1]]
+
+
+class FrameProfiler:
+    """
+    Opt-in timing of the main loop phases.
+
+    The loop calls begin_frame(), mark(phase) after each phase and end_frame();
+    a phase that runs several times per frame (logic steps) adds up. Every
+    frame goes into rolling per-phase histories for the HUD and into the ring
+    file. While disabled every call returns after one attribute check.
+    """
+    def __init__(self, history=None, path=None, capacity=None):
+        self.enabled = False
+        self.history = history or config.PROFILER_HISTORY
+        self.path = path or config.PROFILER_FILE
+        self.capacity = capacity or config.PROFILER_FILE_RECORDS
+        self.samples = {phase: deque(maxlen=self.history) for phase in PHASES + ["frame"]}
+        self._current = dict.fromkeys(PHASES, 0.0)
+        self._frame_start = None
+        self._last = None
+        self._ring = None
+        self._hud_lines = []
+        self._hud_time = 0
+
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+
+    def set_enabled(self, enabled):
+        if enabled and self._ring is None and self.path:
+            try:
+                self._ring = ProfileRing(self.path, PHASES, self.capacity)
+            except OSError as e:
+                print(f"[PROFILER] Can't write {self.path}: {e}")
+        self.enabled = enabled
+        self._frame_start = None
+        self._hud_time = 0
+        print(f"[PROFILER] {'ON, recording to ' + str(self.path) if enabled else 'OFF'}")
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._frame_start = self._last = now
+        for phase in PHASES:
+            self._current[phase] = 0.0
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to phase"""
+        if not self.enabled or self._last is None:
+            return
+        now = time.perf_counter()
+        self._current[phase] += (now - self._last) * 1000.0
+        self._last = now
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        frame_ms = (time.perf_counter() - self._frame_start) * 1000.0
+        self.samples["frame"].append(frame_ms)
+        phase_ms = [self._current[phase] for phase in PHASES]
+        for phase, ms in zip(PHASES, phase_ms):
+            self.samples[phase].append(ms)
+        if self._ring is not None:
+            self._ring.append(time.time(), frame_ms, phase_ms)
+        self._last = None
+
+    def hud_lines(self):
+        """HUD text (p50/p95/max ms per phase), recomputed at most PROFILER_HUD_HZ times a second"""
+        now = time.monotonic()
+        if now - self._hud_time >= 1.0 / config.PROFILER_HUD_HZ:
+            self._hud_time = now
+            lines = ["ms     p50  p95  max"]
+            for phase in ["frame"] + PHASES:
+                p50, p95, _, worst = percentiles(self.samples[phase])
+                lines.append(f"{phase:6s}{p50:5.1f}{p95:5.1f}{worst:5.1f}")
+            self._hud_lines = lines
+        return self._hud_lines
+
+    def close(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+
+class ToggleChord:
+    """
+    The hold-to-toggle HUD chord (PROFILER_TOGGLE_KEYS), kept away from the game.
+
+    A press of a chord key is held back for up to PROFILER_TOGGLE_WINDOW
+    seconds, along with every key event after it, so the order is kept.
+    If the other chord keys follow within that window, their presses and
+    releases are swallowed, and holding them PROFILER_TOGGLE_HOLD seconds
+    toggles the HUD. Otherwise the held-back events go through to the
+    game: a tap as soon as it is released, a long press when the window
+    ends.
+    """
+    def __init__(self, keys=None, hold=None, window=None):
+        self.keys = frozenset(keys or config.PROFILER_TOGGLE_KEYS)
+        self.hold = hold if hold is not None else config.PROFILER_TOGGLE_HOLD
+        self.window = window if window is not None else config.PROFILER_TOGGLE_WINDOW
+        self._pending = []  # Held-back KeyEvents, oldest first
+        self._waited = 0.0
+        self._swallowed = set()  # Chord keys down whose events the game must not see
+        self._held = 0.0
+
+    def filter(self, key_events, dt):
+        """Return (KeyEvents for the game, True if the HUD should toggle) for one logic step"""
+        passed = []
+        for key_event in key_events:
+            key = key_event.key
+            if key in self._swallowed:
+                if not key_event.pressed:
+                    self._swallowed.discard(key)
+                continue
+            if self._pending or (key_event.pressed and key in self.keys):
+                self._pending.append(key_event)
+            else:
+                passed.append(key_event)
+            if key_event.pressed and key in self.keys and self._chord_formed():
+                # Chord: drop its presses, the rest still goes to the game
+                self._swallowed = set(self.keys)
+                self._pending = [e for e in self._pending if e.key not in self.keys]
+                self._held = 0.0
+                passed += self._pending
+                self._pending = []
+
+        if self._pending:
+            self._waited += dt
+            released = any(not e.pressed and e.key in self.keys for e in self._pending)
+            if released or self._waited >= self.window:
+                passed += self._pending
+                self._pending = []
+        if not self._pending:
+            self._waited = 0.0
+
+        toggle = False
+        if self._swallowed == self.keys:
+            self._held += dt
+            if self._held >= self.hold > self._held - dt:
+                toggle = True  # Once per hold
+        return passed, toggle
+
+    def _chord_formed(self):
+        down = set()
+        for key_event in self._pending:
+            if key_event.key in self.keys:
+                if key_event.pressed:
+                    down.add(key_event.key)
+                else:
+                    down.discard(key_event.key)
+        return down == self.keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise a profiler ring file")
+    parser.add_argument("path", nargs="?", default=config.PROFILER_FILE)
+    parser.add_argument("--csv", action="store_true", help="Print every record as CSV instead")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"No profile at {args.path}")
+        return 1
+    phases, records = read_ring(args.path)
+    if args.csv:
+        print(",".join(["timestamp", "frame"] + phases))
+        for timestamp, frame_ms, phase_ms in records:
+            print(",".join([f"{timestamp:.3f}", f"{frame_ms:.3f}"] + [f"{ms:.3f}" for ms in phase_ms]))
+        return 0
+
+    print(f"{len(records)} frames")
+    print(f"{'phase':8s}{'p50':>8s}{'p95':>8s}{'p99':>8s}{'max':>8s}")
+    columns = [("frame", [r[1] for r in records])] + [(phase, [r[2][i] for r in records]) for i, phase in enumerate(phases)]
+    for name, samples in columns:
+        print(f"{name:8s}" + "".join(f"{value:8.2f}" for value in percentiles(samples)))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+import argparse
+import time
+from collections import namedtuple
+from . import config
+from .engine import GameEngine
+from .hardware.replay_hardware import ReplayHardware
+from .players import PlayerRegistry
+from .simulation import RecordingTelegram
+
+# divergence: None if the replay entered the recorded states at the recorded times and ended in the same state
+ReplayResult = namedtuple("ReplayResult", ["expected", "actual", "divergence", "steps", "seconds"])
+
+
+def replay(path, speed=None, render=False, players_path=None):
+    """
+    Replay the session recorded at path through a GameEngine and compare
+    its states with the recorded ones.
+
+    speed: None runs the steps as fast as possible, otherwise at speed times
+    real time (1.0: as recorded). render draws the game while it replays
+    (paced replays only). players_path loads that registry (read only),
+    for sessions that relied on players registered before they started.
+    """
+    hw = ReplayHardware(path)
+    hw.initialize()
+    engine = GameEngine(hw, RecordingTelegram(), has_boot_video=hw.has_boot_video, clock=hw.clock)
+    sm = engine.sm
+    expected = sm.state
+    if players_path:
+        sm.players = PlayerRegistry(players_path).load()
+        sm.players.path = None  # Never written back
+    states = []
+    sm.on_enter(None, lambda: states.append((engine.time, sm.state)))
+
+    renderer = None
+    if render and speed:
+        from .ui.renderer import Renderer
+        renderer = Renderer()
+    dt = 1.0 / hw.logic_hz
+    steps = 0
+    start = time.perf_counter()
+    last_render = None
+    while not hw.done:
+        if speed:
+            now = time.perf_counter()
+            if renderer is not None and (last_render is None or now - last_render >= 1.0 / config.RENDER_FPS_MAX):
+                if not _render(renderer, engine):
+                    break  # Window closed
+                last_render = now
+            due = int((now - start) * speed / dt)
+            if steps >= due:
+                time.sleep(min(dt / speed, 0.01))
+                continue
+        hw.advance(engine.time + dt, sm.deadline_ns)
+        engine.has_boot_video = hw.has_boot_video
+        engine.step(dt, hw.get_key_events())
+        steps += 1
+    seconds = time.perf_counter() - start
+    hw.cleanup()
+
+    if hw.states:
+        expected = hw.states[-1][1]
+    divergence = None
+    for i, (recorded, replayed) in enumerate(zip(hw.states, states)):
+        if recorded[1] != replayed[1] or abs(recorded[0] - replayed[0]) > 1e-6:
+            divergence = (f"state change {i + 1}: recorded {recorded[1].name} at {recorded[0]:.2f}s, "
+                          f"replayed {replayed[1].name} at {replayed[0]:.2f}s")
+            break
+    if divergence is None and sm.state != expected:
+        divergence = f"ended in {sm.state.name}, recorded {expected.name}"
+    return ReplayResult(expected, sm.state, divergence, steps, seconds)
+
+
+def _render(renderer, engine):
+    import pygame
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            return False
+    display_input, current_label = engine.labels()
+    renderer.render(engine.sm, display_input, input_label=current_label,
+                    screen_blink=engine.screen_blink_state, text_blink=engine.text_blink_state)
+    if engine.message_overlay:
+        renderer.draw_text(engine.message_overlay, renderer.font_large, config.COLOR_RED, (renderer.width//2, renderer.height//2))
+    renderer.update()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded telemetry session and check it ends the same way")
+    parser.add_argument("path", help="Session file (telemetry/session-*.btl)")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument("--speed", type=float, default=1.0, help="Times real time (default 1: as recorded)")
+    pace.add_argument("--fast", action="store_true", help="As fast as possible, without the display")
+    parser.add_argument("--players", metavar="FILE", help="Players registered before the session (read only)")
+    args = parser.parse_args(argv)
+
+    result = replay(args.path, speed=None if args.fast else args.speed, render=not args.fast, players_path=args.players)
+    print(f"[REPLAY] {result.steps} steps in {result.seconds:.2f}s, final state {result.actual.name}")
+    if result.divergence is not None:
+        print(f"[REPLAY] MISMATCH: {result.divergence}")
+        return 1
+    print("[REPLAY] OK: matches the recording")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+import time
+from . import config
+from .logbuffer import console
+
+
+class FrameScheduler:
+    """
+    Fixed-timestep logic clock with independent render pacing.
+
+    Logic runs in steps of exactly 1/LOGIC_HZ seconds, measured on a
+    monotonic clock, so timers and beeps don't depend on the frame rate.
+    Rendering is paced separately: slow on idle screens, full rate in the
+    countdown phases, and immediately (up to the max rate) when something
+    on screen changed.
+    """
+    def __init__(self, logic_hz=None, clock=time.monotonic, sleep=time.sleep):
+        self.logic_dt = 1.0 / (logic_hz or config.LOGIC_HZ)
+        self.clock = clock
+        self.sleep = sleep
+        self._last_time = clock()
+        self._accumulator = 0.0
+        self._last_render = None
+        self._render_requested = True
+
+    def logic_steps(self):
+        """Number of fixed logic steps due since the last call"""
+        now = self.clock()
+        self._accumulator += now - self._last_time
+        self._last_time = now
+
+        steps = int(self._accumulator / self.logic_dt)
+        self._accumulator -= steps * self.logic_dt
+        if steps > config.MAX_LOGIC_STEPS:
+            # Stalled for too long (e.g. a blocking call): don't burn CPU replaying it all
+            console.write(f"[SCHEDULER] Dropped {steps - config.MAX_LOGIC_STEPS} logic steps")
+            steps = config.MAX_LOGIC_STEPS
+        return steps
+
+    def request_render(self):
+        """Something visible changed, render on the next opportunity"""
+        self._render_requested = True
+
+    def should_render(self, fps):
+        """True if a frame is due at this screen's render rate (fps)"""
+        now = self.clock()
+        if self._last_render is None:
+            due = True
+        elif self._render_requested:
+            due = now - self._last_render >= 1.0 / config.RENDER_FPS_MAX
+        else:
+            due = now - self._last_render >= 1.0 / fps
+        if due:
+            self._last_render = now
+            self._render_requested = False
+        return due
+
+    def wait(self):
+        """Sleep until the next logic step is due"""
+        remaining = self.logic_dt - self._accumulator - (self.clock() - self._last_time)
+        if remaining > 0:
+            self.sleep(remaining)
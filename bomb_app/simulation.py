@@ -0,0 +1,195 @@
+import argparse
+import math
+import time
+from collections import Counter
+from . import config
+from .engine import GameEngine
+from .hardware.keypad import KeyEvent
+from .state_machine import GameState
+
+
+class RecordingBuzzer:
+    """Buzzer stand-in that records (game time, duration_ms) for every beep"""
+    def __init__(self):
+        self.engine = None
+        self.beeps = []
+        self.cancels = 0
+
+    def beep(self, duration_ms):
+        self.beeps.append((self.engine.time, duration_ms))
+
+    def cancel_beep(self):
+        self.cancels += 1
+
+
+class RecordingTelegram:
+    """Telegram stand-in that records (chat_ids, message) instead of sending"""
+    def __init__(self):
+        self.messages = []
+
+    def start(self):
+        pass
+
+    def broadcast(self, chat_ids, message, callback=None, coalesce_key=None, idempotency_key=None):
+        self.messages.append((list(chat_ids), message))
+        return len(chat_ids)
+
+
+class Simulator:
+    """
+    Runs the GameEngine on virtual time, as fast as the CPU allows.
+
+    Steps are the same fixed logic steps the game uses (1/LOGIC_HZ), but with
+    fast_forward the quiet stretches between beeps, blinks and scripted keys
+    are covered in one step, so a minute-long round takes about a hundred steps.
+    """
+    def __init__(self, logic_hz=None, fast_forward=True, has_boot_video=False, telemetry=None):
+        self.dt = 1.0 / (logic_hz or config.LOGIC_HZ)
+        self.fast_forward = fast_forward
+        self.buzzer = RecordingBuzzer()
+        self.telegram = RecordingTelegram()
+        self.engine = GameEngine(self.buzzer, self.telegram, has_boot_video=has_boot_video, telemetry=telemetry)
+        self.buzzer.engine = self.engine
+        self.steps = 0
+        self.states = []  # Every state entered, in order
+
+    def run(self, script, until=None):
+        """
+        Feed script, a list of (seconds from now, key, pressed), and step until
+        the last event (or until seconds from now, if later).
+        Events due by a step are handed to that step, like keys read between frames.
+        """
+        engine = self.engine
+        start = engine.time
+        events = sorted(script, key=lambda event: event[0])
+        end = max([event[0] for event in events] + [until or 0])
+        i = 0
+        while True:
+            now = engine.time - start
+            due = []
+            while i < len(events) and events[i][0] <= now + 1e-9:
+                at, key, pressed = events[i]
+                due.append(KeyEvent(key, pressed, start + at))
+                i += 1
+            if due:
+                self._step(self.dt, due)
+                continue
+            if now >= end - 1e-9:
+                break
+
+            steps = 1
+            if self.fast_forward:
+                # Jump straight to the end of the step the next key or game event falls in:
+                # that step sees it exactly as in real play (rounded down, never past it)
+                quiet = min(engine.next_event_in(), end - now)
+                if i < len(events):
+                    quiet = min(quiet, events[i][0] - now)
+                steps = max(1, math.ceil(quiet / self.dt - 1e-6))
+            self._step(self.dt * steps)
+
+    def _step(self, dt, events=()):
+        self.engine.step(dt, events)
+        self.steps += 1
+        state = self.engine.sm.state
+        if not self.states or self.states[-1] != state:
+            self.states.append(state)
+
+
+def press(keys, at=0.0, gap=0.2, hold=0.05):
+    """Script a key sequence starting at `at`, one press every gap seconds"""
+    script = []
+    for i, key in enumerate(keys):
+        script.append((at + i * gap, key, True))
+        script.append((at + i * gap + hold, key, False))
+    return script
+
+
+def script_end(script):
+    return max(event[0] for event in script)
+
+
+# Scripted rounds, each starting and ending on the READY screen (static PIN mode).
+# With plant/defuse times of PLANT_TIME/DEFUSE_TIME seconds.
+PLANT_TIME = 40
+DEFUSE_TIME = 40
+
+def round_defused():
+    script = press("*", 0.5) + press("*" + config.ARM_PIN + "#", 5.0)
+    script += press("*" + config.DEFUSE_PIN + "#", 20.0)
+    return script + press("#", script_end(script) + 2.0)
+
+def round_wrong_pin():
+    # Wrong arming code, then wrong defuse code, then the right one
+    script = press("*", 0.5) + press("*0000#", 3.0) + press("*" + config.ARM_PIN + "#", 8.0)
+    script += press("*9999#", 15.0) + press("*" + config.DEFUSE_PIN + "#", 25.0)
+    return script + press("#", script_end(script) + 2.0)
+
+def round_exploded():
+    script = press("*", 0.5) + press("*" + config.ARM_PIN + "#", 5.0)
+    explode_at = script_end(script) + DEFUSE_TIME + 1.0
+    return script + press("#", explode_at)
+
+def round_time_out():
+    script = press("*", 0.5)
+    return script + press("#", PLANT_TIME + 2.0)
+
+def round_reset():
+    # Hold # for 2.5s mid-countdown: back to PIN type select, then reconfigure
+    script = press("*", 0.5) + press("*" + config.ARM_PIN + "#", 5.0)
+    script += press("#", 10.0, hold=2.5)
+    return script + setup_script(13.0)
+
+ROUNDS = {
+    "defused": (round_defused, GameState.DEFUSED),
+    "wrong_pin": (round_wrong_pin, GameState.DEFUSED),
+    "exploded": (round_exploded, GameState.EXPLODED),
+    "time_out": (round_time_out, GameState.TIME_OUT),
+    "reset": (round_reset, GameState.PIN_TYPE_SELECT),
+}
+
+def setup_script(at=0.0):
+    """Static PIN mode and round times, from PIN type select to READY"""
+    return press(f"1#{PLANT_TIME}#{DEFUSE_TIME}##", at)
+
+
+def simulate(rounds, names=None, fast_forward=True, telemetry=None):
+    """Play rounds scripted rounds cycling through names, return (simulator, outcomes)"""
+    names = names or list(ROUNDS)
+    sim = Simulator(fast_forward=fast_forward, telemetry=telemetry)
+    sim.run(setup_script(), until=1.0)
+    outcomes = Counter()
+    for i in range(rounds):
+        name = names[i % len(names)]
+        build, expected = ROUNDS[name]
+        sim.states = []
+        sim.run(build())
+        ok = expected in sim.states and sim.engine.sm.state == GameState.READY
+        outcomes[(name, "ok" if ok else "FAILED")] += 1
+    return sim, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scripted rounds headless, faster than real time")
+    parser.add_argument("--rounds", type=int, default=1000)
+    parser.add_argument("--round", choices=list(ROUNDS), action="append", help="Round type (repeatable, default: all)")
+    parser.add_argument("--no-fast-forward", action="store_true", help="Step every 1/LOGIC_HZ like the real loop")
+    parser.add_argument("--telemetry", metavar="DIR", help="Record the session there (read with python -m bomb_app.telemetry DIR)")
+    args = parser.parse_args()
+
+    telemetry = None
+    if args.telemetry:
+        from .telemetry import TelemetryRecorder
+        telemetry = TelemetryRecorder(args.telemetry)
+    start = time.perf_counter()
+    sim, outcomes = simulate(args.rounds, args.round, not args.no_fast_forward, telemetry)
+    elapsed = time.perf_counter() - start
+    if telemetry is not None:
+        telemetry.close()
+
+    for (name, result), count in sorted(outcomes.items()):
+        print(f"{name:10s} {result:6s} {count}")
+    print(f"{args.rounds} rounds, {sim.engine.time / 3600:.1f} game hours, {len(sim.buzzer.beeps)} beeps, "
+          f"{sim.steps} steps in {elapsed:.2f}s ({args.rounds / elapsed:.0f} rounds/s)")
+
+if __name__ == "__main__":
+    main()
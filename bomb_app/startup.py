@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+class StartupTimer:
+    """
+    Where the time between launching main.py and the first frame goes.
+
+    The main thread calls mark(step) after each startup step; background
+    loaders call log(what) when they finish. report() prints the steps once
+    the first frame is on screen, against the startup budget.
+    """
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.steps = []  # (step, ms)
+        self._last = self.start
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, (now - self._last) * 1000.0))
+        self._last = now
+
+    def log(self, what):
+        """A background step finished (printed right away, with the time since launch)"""
+        with self._lock:
+            print(f"[STARTUP] +{self.elapsed_ms():.0f} ms {what} (background)")
+
+    def report(self, budget_ms):
+        total = sum(ms for _, ms in self.steps)
+        with self._lock:
+            for step, ms in self.steps:
+                print(f"[STARTUP] {step:28s}{ms:8.1f} ms")
+            verdict = "OK" if total <= budget_ms else "OVER BUDGET"
+            print(f"[STARTUP] first frame after {total:.0f} ms (budget {budget_ms} ms) {verdict}")
+        return total
+
+
+def run_in_background(name, target, startup=None):
+    """Run target() on a daemon thread, logging to startup when it is done"""
+    def run():
+        try:
+            target()
+        except Exception as e:
+            print(f"[WARNING] {name} failed: {e}")
+            return
+        if startup is not None:
+            startup.log(f"{name} ready")
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -1,4 +1,8 @@
 from enum import Enum, auto
+from . import config
+from .clock import ManualClock
+from .logbuffer import LogBuffer, console
+from .players import PlayerRegistry
 
 class GameState(Enum):
     BOOT = auto()
@@ -12,52 +16,171 @@ class GameState(Enum):
     DEFUSED = auto()
     TIME_OUT = auto() # Failed to plant in time
 
+END_STATES = (GameState.EXPLODED, GameState.DEFUSED, GameState.TIME_OUT)
+
+# (state, event) -> (next state, action names). Actions are looked up in
+# StateMachine.actions and run between the exit and entry hooks.
+TRANSITIONS = {
+    (GameState.BOOT, "skip"): (GameState.PIN_TYPE_SELECT, ()),
+    (GameState.PIN_TYPE_SELECT, "static_pin"): (GameState.CONFIG, ()),
+    (GameState.PIN_TYPE_SELECT, "dynamic_pin"): (GameState.PLAYER_REGISTRATION, ("start_telegram",)),
+    (GameState.PLAYER_REGISTRATION, "done"): (GameState.CONFIG, ()),
+    (GameState.CONFIG, "confirm"): (GameState.READY, ()),
+    (GameState.READY, "start"): (GameState.PLANT_PHASE, ()),
+    (GameState.PLANT_PHASE, "armed"): (GameState.DEFUSE_PHASE, ("notify_planted",)),
+    (GameState.PLANT_PHASE, "timer_expired"): (GameState.TIME_OUT, ()),
+    (GameState.DEFUSE_PHASE, "defused"): (GameState.DEFUSED, ()),
+    (GameState.DEFUSE_PHASE, "timer_expired"): (GameState.EXPLODED, ()),
+}
+for _state in END_STATES:
+    TRANSITIONS[(_state, "restart")] = (GameState.READY, ())
+for _state in GameState:
+    # Long # press, from anywhere
+    TRANSITIONS[(_state, "reset")] = (GameState.PIN_TYPE_SELECT, ("cancel_beep", "show_reset"))
+
 class StateMachine:
-    def __init__(self):
+    """
+    Game state, the transition table and the countdown.
+
+    The countdown runs against an absolute deadline on clock (a
+    GameClock; by default a ManualClock that tick(dt) moves forward), so the
+    time left is deadline - now and never drifts with the step size.
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or ManualClock()
+        self._deadline_ns = None # Set while a countdown runs
+        self._timer_ns = 0 # Time left while stopped
         self.state = GameState.BOOT
+        self.transitions = TRANSITIONS
+        self.actions = {} # Action name -> callable, supplied by the owner (GameEngine)
+        self._on_enter = {} # GameState (None = any) -> [callable]
+        self._on_exit = {}
+        self.last_event = None # Event behind the latest state change (None: transition_to)
         self.plant_time = 0
         self.defuse_time = 0
-        self.current_timer = 0
         self.pin_mode = 1 # 1 for Static, 2 for Dynamic
-        self.player_phones = [] # List of phone numbers
+        self.players = PlayerRegistry() # Registered phones (main swaps in the saved registry)
         self.dynamic_pin = "" # PIN set during plant
-        self.logs = [] # Last 10 console logs
+        self.logs = LogBuffer(config.CONSOLE_LOG_LINES) # Last console log records
         self.show_console = False # For PIN Type 2/3 overlay
+        self._time_string = "00:00.000"
+        self._time_string_ms = 0
+        
+        self.on_enter(GameState.PLANT_PHASE, self._start_plant_timer)
+        self.on_enter(GameState.DEFUSE_PHASE, self._start_defuse_timer)
         
     def set_times(self, plant, defuse):
         self.plant_time = plant
         self.defuse_time = defuse
         
+    def on_enter(self, state, hook):
+        """Call hook() whenever state is entered (state=None: any state)"""
+        self._on_enter.setdefault(state, []).append(hook)
+
+    def on_exit(self, state, hook):
+        """Call hook() whenever state is left (state=None: any state)"""
+        self._on_exit.setdefault(state, []).append(hook)
+
+    def dispatch(self, event):
+        """
+        Apply event to the current state through the transition table.
+        Returns False (and changes nothing) if the state doesn't handle it.
+        """
+        transition = self.transitions.get((self.state, event))
+        if transition is None:
+            return False
+        new_state, actions = transition
+        self.last_event = event
+        self._run_hooks(self._on_exit, self.state)
+        for action in actions:
+            self.actions[action]()
+        self._enter(new_state)
+        return True
+
     def transition_to(self, new_state):
+        """Go to new_state directly, bypassing the table (hooks still run)"""
+        self.last_event = None
+        self._run_hooks(self._on_exit, self.state)
+        self._enter(new_state)
+
+    def _enter(self, new_state):
         self.state = new_state
+        self._stop_countdown() # Countdown states restart it in their entry hook
         self.show_console = False # Reset overlay on state change
         if new_state == GameState.BOOT:
-            self.logs = [] # Clear logs on reboot/reset
-        if new_state == GameState.PLANT_PHASE:
-            self.current_timer = self.plant_time
-        elif new_state == GameState.DEFUSE_PHASE:
-            self.current_timer = self.defuse_time
+            self.logs.clear() # Clear logs on reboot/reset
+        self._run_hooks(self._on_enter, new_state)
+
+    def _run_hooks(self, hooks, state):
+        for hook in hooks.get(None, ()):
+            hook()
+        for hook in hooks.get(state, ()):
+            hook()
+
+    def _start_plant_timer(self):
+        self._start_countdown(self.plant_time)
+
+    def _start_defuse_timer(self):
+        self._start_countdown(self.defuse_time)
+
+    def _start_countdown(self, seconds):
+        self._deadline_ns = self.clock.now_ns() + round(seconds * 1e9)
+
+    def _stop_countdown(self):
+        if self._deadline_ns is not None:
+            self._timer_ns = self._time_left_ns()
+            self._deadline_ns = None
+
+    def _time_left_ns(self):
+        if self._deadline_ns is None:
+            return self._timer_ns
+        return max(0, self._deadline_ns - self.clock.now_ns())
+
+    @property
+    def deadline_ns(self):
+        """Clock time the countdown runs out at, None while not counting"""
+        return self._deadline_ns
+
+    @property
+    def counting(self):
+        """True while a countdown runs"""
+        return self._deadline_ns is not None
+
+    @property
+    def current_timer(self):
+        """Seconds left on the countdown"""
+        return self._time_left_ns() / 1e9
+
+    @current_timer.setter
+    def current_timer(self, seconds):
+        if self._deadline_ns is None:
+            self._timer_ns = round(seconds * 1e9)
+        else:
+            self._start_countdown(seconds)
+
+    def remaining_ms(self):
+        """Whole milliseconds left on the countdown"""
+        return self._time_left_ns() // 1000000
             
-    def log(self, message):
-        """Add message to logs and keep only last 10"""
-        self.logs.append(message)
-        if len(self.logs) > 10:
-            self.logs = self.logs[-10:]
-        print(f"[CONSOLE] {message}")
+    def log(self, message, level="INFO"):
+        """Add message to the console log ring; stdout gets it from the background printer"""
+        self.logs.append(level, message)
+        console.write(f"[CONSOLE] {message}")
             
     def tick(self, dt):
-        """Seconds passed"""
-        if self.state in [GameState.PLANT_PHASE, GameState.DEFUSE_PHASE]:
-            self.current_timer -= dt
-            if self.current_timer <= 0:
-                self.current_timer = 0
-                if self.state == GameState.PLANT_PHASE:
-                    self.transition_to(GameState.TIME_OUT)
-                elif self.state == GameState.DEFUSE_PHASE:
-                    self.transition_to(GameState.EXPLODED)
+        """Seconds passed (moves a virtual clock; a real one has moved by itself)"""
+        self.clock.advance(dt)
+        if self._deadline_ns is not None and self._deadline_ns <= self.clock.now_ns():
+            self._deadline_ns = None
+            self._timer_ns = 0
+            self.dispatch("timer_expired")
                     
     def get_time_string(self):
-        m = int(self.current_timer // 60)
-        s = int(self.current_timer % 60)
-        ms = int((self.current_timer % 1) * 1000)
-        return f"{m:02d}:{s:02d}.{ms:03d}"
+        ms = self.remaining_ms()
+        if ms != self._time_string_ms:
+            # Integer maths, and only when the shown millisecond changed
+            m, ms_in_minute = divmod(ms, 60000)
+            s, ms_in_second = divmod(ms_in_minute, 1000)
+            self._time_string = f"{m:02d}:{s:02d}.{ms_in_second:03d}"
+            self._time_string_ms = ms
+        return self._time_string
@@ -1,6 +1,34 @@
 import os
+from .config import DATA_DIR
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_PROVIDER = os.getenv("TELEGRAM_PROVIDER", "MOCK") # Default provider "MOCK" or "REAL"
 TELEGRAM_CHAT_ID_TERRORISTS = os.getenv("TELEGRAM_CHAT_ID_TERRORISTS", "")
-TELEGRAM_CHAT_ID_COUNTERTERRORISTS = os.getenv("TELEGRAM_CHAT_ID_COUNTERTERRORISTS", "")
\ No newline at end of file
+TELEGRAM_CHAT_ID_COUNTERTERRORISTS = os.getenv("TELEGRAM_CHAT_ID_COUNTERTERRORISTS", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "5")) # Seconds per HTTP request
+TELEGRAM_MAX_RETRIES = 3 # Extra attempts after a failed send
+TELEGRAM_RETRY_BACKOFF = 1.0 # Seconds before the first retry, doubled each time
+TELEGRAM_QUEUE_SIZE = 1024 # Messages waiting for the background senders (a broadcast to every player fits)
+TELEGRAM_WORKERS = 4 # Sender threads kept running
+TELEGRAM_WORKERS_MAX = 64 # Senders added while messages wait, so a broadcast reaches its chats side by side
+TELEGRAM_RATE_GLOBAL = 30 # Messages per second across all chats (Telegram bot limit)
+TELEGRAM_RATE_PER_CHAT = 1 # Messages per second to one chat
+TELEGRAM_COALESCE_WINDOW = 5.0 # Seconds in which a repeated identical broadcast is dropped
+# Durable outbox ("" disables); MOCK sends nothing, so it keeps none unless asked to
+TELEGRAM_OUTBOX_PATH = os.getenv("TELEGRAM_OUTBOX_PATH", os.path.join(DATA_DIR, "telegram_outbox.db") if TELEGRAM_PROVIDER == "REAL" else "")
+TELEGRAM_OUTBOX_RETRY_INTERVAL = 30.0 # Seconds between attempts to drain undelivered messages
+TELEGRAM_OUTBOX_RETENTION = 24 * 3600 # Seconds delivered keys are kept to skip duplicates
+TELEGRAM_OUTBOX_COMPACT_EVERY = 32 # Deliveries between compactions
+
+def _parse_player_chat_ids(value):
+    """'phone:chat_id,phone:chat_id' -> {phone: chat_id}"""
+    mapping = {}
+    for entry in value.split(","):
+        if ":" in entry:
+            phone, chat_id = entry.split(":", 1)
+            mapping[phone.strip()] = chat_id.strip()
+    return mapping
+
+# Registered player phone -> their Telegram chat ID
+TELEGRAM_PLAYER_CHAT_IDS = _parse_player_chat_ids(os.getenv("TELEGRAM_PLAYER_CHAT_IDS", ""))
@@ -0,0 +1,142 @@
+import queue
+import sqlite3
+import threading
+import time
+from . import telegram_config
+
+
+class TelegramOutbox:
+    """
+    On-disk record of outgoing Telegram messages (SQLite in WAL mode).
+
+    Every message is stored under an idempotency key before it is sent and
+    marked delivered afterwards, so messages that could not be sent survive
+    network drops, restarts and power cuts and are picked up by pending().
+    Writes happen on a dedicated thread that commits whatever has queued up
+    in one transaction (one fsync), so callers never wait for the disk.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")  # Commit = WAL fsync, on the writer thread only
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "key TEXT PRIMARY KEY, chat_id TEXT NOT NULL, message TEXT NOT NULL, "
+            "coalesce_key TEXT, created REAL NOT NULL, delivered REAL)"
+        )
+        self._lock = threading.Lock()
+        self._writes = queue.Queue()
+        self._thread = None
+        self._delivered_since_compact = 0
+        self.compact()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self._thread.start()
+
+    def add(self, key, chat_id, message, coalesce_key=None, on_stored=None):
+        """
+        Queue a message for storage and return immediately.
+        Adding an undelivered key again replaces its text; a key that was
+        already delivered is ignored. on_stored(stored) is called from the
+        writer thread once the record is on disk (stored=False if ignored).
+        """
+        self._writes.put(("add", key, str(chat_id), message, coalesce_key, on_stored))
+
+    def mark_delivered(self, key):
+        self._writes.put(("delivered", key))
+
+    def discard(self, key):
+        """Forget a message that will never be sent (e.g. rejected chat)"""
+        self._writes.put(("discard", key))
+
+    def pending(self):
+        """Undelivered messages as (key, chat_id, message, coalesce_key), oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, chat_id, message, coalesce_key FROM outbox "
+                "WHERE delivered IS NULL ORDER BY created, rowid"
+            ).fetchall()
+
+    def compact(self):
+        """Drop delivered records past the retention time and shrink the WAL"""
+        cutoff = time.time() - telegram_config.TELEGRAM_OUTBOX_RETENTION
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE delivered IS NOT NULL AND delivered < ?", (cutoff,))
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._delivered_since_compact = 0
+
+    def flush(self):
+        """Block until everything queued so far is written and its on_stored called"""
+        if self._thread is not None:
+            self._writes.join()
+
+    def close(self):
+        """Write everything queued, compact and close the database"""
+        if self._thread is not None:
+            self._writes.put(None)
+            self._thread.join()
+            self._thread = None
+        self.compact()
+        with self._lock:
+            self._conn.close()
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            done = len(batch)
+            if None in batch:
+                running = False
+                batch = [op for op in batch if op is not None]
+
+            stored = []
+            try:
+                with self._lock:
+                    self._conn.execute("BEGIN")
+                    for op in batch:
+                        stored.append(self._apply(op))
+                    self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                print(f"[TELEGRAM OUTBOX] Write failed: {e}")
+                with self._lock:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                # Not on disk, but still worth sending
+                stored = [True] * len(batch)
+
+            for op, ok in zip(batch, stored):
+                if op[0] == "add" and op[5] is not None:
+                    op[5](ok)
+
+            if self._delivered_since_compact >= telegram_config.TELEGRAM_OUTBOX_COMPACT_EVERY:
+                self.compact()
+            for _ in range(done):
+                self._writes.task_done()
+
+    def _apply(self, op):
+        kind, key = op[0], op[1]
+        if kind == "add":
+            chat_id, message, coalesce_key = op[2], op[3], op[4]
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (key, chat_id, message, coalesce_key, created) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET message = excluded.message WHERE delivered IS NULL",
+                (key, chat_id, message, coalesce_key, time.time()),
+            )
+            if cursor.rowcount == 0:
+                print(f"[TELEGRAM OUTBOX] {key} already delivered, skipped")
+                return False
+            return True
+        if kind == "delivered":
+            self._conn.execute("UPDATE outbox SET delivered = ? WHERE key = ?", (time.time(), key))
+            self._delivered_since_compact += 1
+        elif kind == "discard":
+            self._conn.execute("DELETE FROM outbox WHERE key = ?", (key,))
+        return True
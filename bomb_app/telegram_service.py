@@ -1,43 +1,434 @@
-
+import atexit
+import queue
+import threading
+import time
+import uuid
 import requests
 from . import telegram_config
+from .telegram_outbox import TelegramOutbox
+
+class TokenBucket:
+    """Rate limiter: rate tokens per second, bursts of up to capacity"""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning how long to wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class _Job:
+    def __init__(self, key, chat_id, message, callback, coalesce_key):
+        self.key = key  # Idempotency key, also the outbox record
+        self.chat_id = chat_id
+        self.message = message
+        self.callback = callback
+        self.coalesce_key = coalesce_key
 
 class TelegramService:
     def __init__(self):
         self.token = telegram_config.TELEGRAM_BOT_TOKEN
         self.provider = telegram_config.TELEGRAM_PROVIDER
-                
+        self.api_url = telegram_config.TELEGRAM_API_URL
+        self.timeout = telegram_config.TELEGRAM_TIMEOUT
+        self.max_retries = telegram_config.TELEGRAM_MAX_RETRIES
+        self.retry_backoff = telegram_config.TELEGRAM_RETRY_BACKOFF
+        self.rate_per_chat = telegram_config.TELEGRAM_RATE_PER_CHAT
+        self.outbox_path = telegram_config.TELEGRAM_OUTBOX_PATH
+        self.outbox = None
+        self._opener = None  # Thread opening the outbox
+        self._unsaved = {}  # key -> _Job queued while the outbox was still opening
+
+        self._local = threading.local()  # One keep-alive requests.Session per sender thread
+        self._jobs = queue.Queue(maxsize=telegram_config.TELEGRAM_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._workers = []
+        self._running = False
+        self._senders = 0
+        self._idle = 0  # Senders waiting for a message
+        self._worker_lock = threading.Lock()
+        self._exit_registered = False
+
+        # Undelivered messages wait in the outbox and are retried by the drainer
+        self._drain = threading.Event()
+        self._parked = {}  # key -> _Job that ran out of retries
+        self._active = set()  # Keys queued, in flight or parked
+
+        # Telegram limits: ~30 messages/s per bot, ~1 message/s per chat
+        self._global_bucket = TokenBucket(telegram_config.TELEGRAM_RATE_GLOBAL, telegram_config.TELEGRAM_RATE_GLOBAL)
+        self._chat_buckets = {}
+        self._pending = {}  # (coalesce_key, chat_id) -> queued _Job
+        self._recent = {}  # (coalesce_key, chat_id) -> (message, time sent)
+
+    def _get_session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def _post(self, chat_id, message):
+        """One delivery attempt. Returns (sent, retryable)"""
+        try:
+            url = f"{self.api_url}/bot{self.token}/sendMessage"
+            payload = {
+                "chat_id": chat_id,
+                "text": message
+            }
+            response = self._get_session().post(url, data=payload, timeout=self.timeout)
+            if response.status_code == 200:
+                print(f"[TELEGRAM REAL] Message sent to {chat_id}")
+                return True, False
+            print(f"[TELEGRAM REAL] Error {response.status_code}: {response.text}")
+            # Rate limited or server side trouble is worth another try, a bad chat/token is not
+            return False, response.status_code == 429 or response.status_code >= 500
+        except Exception as e:
+            print(f"[TELEGRAM REAL] Exception: {e}")
+            return False, True
+
     def send_message(self, chat_id, message):
         """
-        Sends a Telegram message to the specified chat ID.
+        Sends a Telegram message to the specified chat ID (blocking, single attempt).
         chat_id: String or Integer
         message: String content
         """
         print(f"[TELEGRAM SERVICE] Sending to {chat_id}: {message}")
-        
+
         if self.provider == "MOCK":
             print(f"[TELEGRAM MOCK] SUCCESS")
             return True
-            
+
         elif self.provider == "REAL":
-            try:
-                url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-                payload = {
-                    "chat_id": chat_id,
-                    "text": message
-                }
-                response = requests.post(url, data=payload)
-                if response.status_code == 200:
-                    print(f"[TELEGRAM REAL] Message sent to {chat_id}")
-                    return True
-                else:
-                    print(f"[TELEGRAM REAL] Error {response.status_code}: {response.text}")
-                    return False
-            except Exception as e:
-                print(f"[TELEGRAM REAL] Exception: {e}")
-                return False
-        
+            return self._post(chat_id, message)[0]
+
         return False
 
+    def send_message_async(self, chat_id, message, callback=None, coalesce_key=None, idempotency_key=None):
+        """
+        Queue a message for the background senders and return immediately,
+        without touching the disk. The message is written to the outbox before
+        it is sent (or, while start() is still opening the outbox, as soon as
+        it is open), so if the network is down it is retried later, also after
+        a restart.
+        callback(chat_id, message, sent) is called from a sender thread once
+        the message is delivered or retries are exhausted (and again when a
+        message left in the outbox gets through later).
+        Messages with the same coalesce_key to the same chat are merged:
+        a newer one replaces one still queued, and an identical repeat within
+        TELEGRAM_COALESCE_WINDOW seconds is dropped.
+        A message whose idempotency_key was already queued or delivered is
+        not sent again.
+        Returns False if the message could not be queued.
+        """
+        self._start()
+        key = idempotency_key or uuid.uuid4().hex
+        with self._worker_lock:
+            if key in self._active:
+                return True
+            if coalesce_key is not None:
+                pending = self._pending.get((coalesce_key, chat_id))
+                if pending is not None:
+                    pending.message = message  # Still queued, send the latest text only
+                    if self.outbox is not None:
+                        self.outbox.add(pending.key, chat_id, message, coalesce_key)
+                    return True
+                recent = self._recent.get((coalesce_key, chat_id))
+                if recent is not None and recent[0] == message and time.monotonic() - recent[1] < telegram_config.TELEGRAM_COALESCE_WINDOW:
+                    return True  # Same event fired again, already delivered
+            job = _Job(key, chat_id, message, callback, coalesce_key)
+            if coalesce_key is not None:
+                self._pending[(coalesce_key, chat_id)] = job
+            self._active.add(key)
+            outbox = self.outbox
+            if outbox is None and self._opener is not None:
+                self._unsaved[key] = job
+
+        if outbox is None:
+            return self._submit(job)
+        # Hand the message to the senders once it is safely on disk
+        outbox.add(key, chat_id, message, coalesce_key, lambda stored: self._submit(job) if stored else self._forget(job))
+        return True
+
+    def broadcast(self, chat_ids, message, callback=None, coalesce_key=None, idempotency_key=None):
+        """
+        Send message to every chat in chat_ids concurrently: senders are added
+        while chats wait (up to TELEGRAM_WORKERS_MAX), so reaching all of them
+        takes about one round trip. Past TELEGRAM_RATE_GLOBAL chats, Telegram's
+        own limit paces the rest. Empty and repeated chat IDs are skipped.
+        coalesce_key defaults to the message text, so a rapid repeat of the same
+        event results in a single message per chat.
+        idempotency_key (optional) identifies the event; each chat gets its own
+        key derived from it.
+        Returns the number of chats the message was queued for.
+        """
+        if coalesce_key is None:
+            coalesce_key = message
+        queued = 0
+        for chat_id in dict.fromkeys(chat_id for chat_id in chat_ids if chat_id):
+            key = f"{idempotency_key}:{chat_id}" if idempotency_key else None
+            if self.send_message_async(chat_id, message, callback, coalesce_key, key):
+                queued += 1
+        return queued
+
+    def start(self):
+        """
+        Start the senders, open the outbox and resend what a previous run left
+        undelivered. Waits for the disk, so call it off the game loop.
+        """
+        opener = self._start()
+        if opener is not None:
+            opener.join()
+
+    def _start(self):
+        """Start the senders and the outbox opener without waiting for either. Returns the opener"""
+        with self._worker_lock:
+            if not self._running:
+                self._running = True
+                self._stop.clear()
+                self._senders = 0
+                self._idle = 0
+                for _ in range(telegram_config.TELEGRAM_WORKERS):
+                    self._add_sender()
+                drainer = threading.Thread(target=self._drain_outbox, name="telegram-drain", daemon=True)
+                drainer.start()
+                self._workers.append(drainer)
+                if self.outbox_path and self.outbox is None:
+                    self._opener = threading.Thread(target=self._open_outbox, name="telegram-outbox-open", daemon=True)
+                    self._opener.start()
+                if not self._exit_registered:
+                    atexit.register(self.stop, telegram_config.TELEGRAM_TIMEOUT)
+                    self._exit_registered = True
+            return self._opener
+
+    def _add_sender(self):
+        # Caller holds _worker_lock
+        worker = threading.Thread(target=self._run, name=f"telegram-sender-{self._senders}", daemon=True)
+        worker.start()
+        self._workers.append(worker)
+        self._senders += 1
+        if not self._running:
+            self._jobs.put(None)  # Added while stop() empties the queue: its own stop marker
+
+    def _grow(self):
+        """Add a sender when messages wait and every sender is busy"""
+        if self._jobs.empty():
+            return
+        with self._worker_lock:
+            if not self._stop.is_set() and self._idle == 0 and self._senders < telegram_config.TELEGRAM_WORKERS_MAX:
+                self._add_sender()
+
+    def _open_outbox(self):
+        """Open the outbox, store the messages queued meanwhile and park those a previous run left"""
+        try:
+            outbox = TelegramOutbox(self.outbox_path)
+            outbox.start()
+            left = outbox.pending()
+        except Exception as e:
+            print(f"[TELEGRAM SERVICE] Outbox unavailable ({e}), messages are not kept across restarts")
+            with self._worker_lock:
+                self._opener = None
+                parked = list(self._parked.values())
+                self._parked.clear()
+                self._unsaved.clear()
+            for job in parked:
+                self._forget(job)
+            return
+
+        with self._worker_lock:
+            # Added under the lock so a sender marks a message delivered only after it is stored
+            for job in self._unsaved.values():
+                outbox.add(job.key, job.chat_id, job.message, job.coalesce_key)
+            self._unsaved.clear()
+            for key, chat_id, message, coalesce_key in left:
+                if key not in self._active:
+                    self._parked[key] = _Job(key, chat_id, message, None, coalesce_key)
+                    self._active.add(key)
+            self.outbox = outbox
+            self._opener = None
+            parked = len(self._parked)
+        if parked:
+            print(f"[TELEGRAM SERVICE] {parked} undelivered message(s) in outbox")
+            self._drain.set()
+
+    def _keeps(self):
+        """Whether undelivered messages can wait in the outbox (or will once it is open)"""
+        return self.outbox is not None or self._opener is not None
+
+    def _submit(self, job):
+        try:
+            self._jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            if self._keeps():
+                self._park(job)  # Kept on disk, the drainer tries again
+                return True
+            print(f"[TELEGRAM SERVICE] Queue full, dropped message to {job.chat_id}")
+            self._forget(job)
+            return False
+
+    def _park(self, job):
+        with self._worker_lock:
+            if job.coalesce_key is not None and self._pending.get((job.coalesce_key, job.chat_id)) is job:
+                del self._pending[(job.coalesce_key, job.chat_id)]
+            self._parked[job.key] = job
+
+    def _forget(self, job):
+        with self._worker_lock:
+            if job.coalesce_key is not None and self._pending.get((job.coalesce_key, job.chat_id)) is job:
+                del self._pending[(job.coalesce_key, job.chat_id)]
+            self._active.discard(job.key)
+            self._unsaved.pop(job.key, None)
+
+    def _drain_outbox(self):
+        """Requeue parked messages every TELEGRAM_OUTBOX_RETRY_INTERVAL, or as soon as a send succeeds"""
+        while not self._stop.is_set():
+            self._drain.wait(telegram_config.TELEGRAM_OUTBOX_RETRY_INTERVAL)
+            if self._stop.is_set():
+                break
+            self._drain.clear()
+            with self._worker_lock:
+                jobs = list(self._parked.values())
+                self._parked.clear()
+            for job in jobs:
+                self._submit(job)
+
+    def _run(self):
+        while True:
+            with self._worker_lock:
+                self._idle += 1
+            job = self._jobs.get()
+            with self._worker_lock:
+                self._idle -= 1
+            if job is None:
+                break
+            self._grow()  # The rest of a broadcast doesn't wait for this send
+            if job.coalesce_key is not None:
+                # From here on the text is fixed: an identical repeat counts as delivered,
+                # a different text queues a new message
+                key = (job.coalesce_key, job.chat_id)
+                with self._worker_lock:
+                    if self._pending.get(key) is job:
+                        del self._pending[key]
+                    self._recent[key] = (job.message, time.monotonic())
+            sent, retryable = self._deliver(job.chat_id, job.message)
+            if not sent and job.coalesce_key is not None:
+                with self._worker_lock:
+                    self._recent.pop(key, None)
+
+            if sent:
+                self._forget(job)
+                if self.outbox is not None:
+                    self.outbox.mark_delivered(job.key)
+                    if self._parked:
+                        self._drain.set()  # Connection is back, flush the backlog
+            elif retryable and self._keeps() and not self._stop.is_set():
+                print(f"[TELEGRAM SERVICE] Kept message to {job.chat_id} in outbox")
+                self._park(job)
+            else:
+                self._forget(job)
+                if self.outbox is not None and not retryable:
+                    self.outbox.discard(job.key)
+
+            if job.callback is not None:
+                try:
+                    job.callback(job.chat_id, job.message, sent)
+                except Exception as e:
+                    print(f"[TELEGRAM SERVICE] Callback error: {e}")
+
+    def _wait_for_rate_limit(self, chat_id):
+        """Block this sender until both the bot-wide and the per-chat limits allow a send"""
+        with self._worker_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_chat, 1)
+                self._chat_buckets[chat_id] = bucket
+        delay = max(self._global_bucket.reserve(), bucket.reserve())
+        return delay <= 0 or not self._stop.wait(delay)
+
+    def _deliver(self, chat_id, message):
+        """Send with bounded retries and exponential backoff. Returns (sent, retryable)"""
+        print(f"[TELEGRAM SERVICE] Sending to {chat_id}: {message}")
+        if self.provider == "MOCK":
+            print(f"[TELEGRAM MOCK] SUCCESS")
+            return True, False
+        if self.provider != "REAL":
+            return False, False
+
+        for attempt in range(self.max_retries + 1):
+            if not self._wait_for_rate_limit(chat_id):
+                return False, True
+            sent, retryable = self._post(chat_id, message)
+            if sent or not retryable or attempt == self.max_retries:
+                return sent, retryable
+            # Interruptible backoff so stop() doesn't wait out a long delay
+            if self._stop.wait(self.retry_backoff * (2 ** attempt)):
+                return False, True
+        return False, True
+
+    def stop(self, timeout=None):
+        """
+        Send what is queued (until timeout) and end the sender threads.
+        Anything not delivered by then stays in the outbox for the next start().
+        """
+        with self._worker_lock:
+            if not self._running:
+                return
+            self._running = False
+            markers = self._senders  # Senders added from here on put their own
+            opener = self._opener
+        if opener is not None:
+            opener.join()  # Queued messages go to the outbox before the senders stop
+        if self.outbox is not None:
+            self.outbox.flush()  # Messages still being written go ahead of the stop markers
+        for _ in range(markers):
+            self._jobs.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # Senders keep being added while a broadcast drains, join until none is left
+        while True:
+            with self._worker_lock:
+                senders = [worker for worker in self._workers if worker.name.startswith("telegram-sender") and worker.is_alive()]
+            if not senders or (deadline is not None and time.monotonic() >= deadline):
+                break
+            senders[0].join(None if deadline is None else max(0, deadline - time.monotonic()))
+        self._stop.set()  # Abandon backoff waits if we timed out, and add no more senders
+        self._drain.set()
+
+        # Timed out: drop what is still queued (it stays in the outbox) and let
+        # the senders finish the request they are in
+        while True:
+            try:
+                self._jobs.get_nowait()
+            except queue.Empty:
+                break
+        with self._worker_lock:
+            workers = self._workers
+            self._workers = []
+        for worker in workers:
+            if worker.name.startswith("telegram-sender") and worker.is_alive():
+                self._jobs.put(None)
+        for worker in workers:
+            worker.join(self.timeout + 1)
+
+        with self._worker_lock:
+            outbox = self.outbox
+            self.outbox = None
+            # Undelivered messages live on in the outbox, start() picks them up again
+            self._parked.clear()
+            self._pending.clear()
+            self._active.clear()
+            self._unsaved.clear()
+        if outbox is not None:
+            outbox.close()
+
 # Singleton instance
 telegram_service = TelegramService()
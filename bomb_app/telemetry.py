@@ -0,0 +1,237 @@
+import argparse
+import glob
+import os
+import struct
+import time
+from . import config
+from .state_machine import GameState, END_STATES
+
+# Session file: header, then fixed-size little-endian records, append only
+FILE_MAGIC = b"BTLM"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHd")  # magic, version, record size, session start (unix time)
+RECORD = struct.Struct("<dBBHi")  # game time, kind, code, extra, countdown ms left (-1: not counting)
+NUMPY_RECORD = [("t", "<f8"), ("kind", "u1"), ("code", "u1"), ("extra", "<u2"), ("timer_ms", "<i4")]
+
+# Record kinds: code / extra
+KEY = 1  # ord(key) / 1 pressed, 0 released
+STATE = 2  # new GameState value / previous GameState value
+WRONG_PIN = 3  # GameState value the wrong code was typed in
+WRONG_PHONE = 4
+REVEAL = 5  # PIN revealed to a registered phone
+CLOCK = 6  # - / -, countdown field: us the countdown clock ran ahead of the logic steps since the countdown started
+SETUP = 7  # 1 boot video, 0 none / logic steps per second
+TIMEOUT = 8  # The countdown ran out on this step (written before the STATE record it causes)
+
+COUNTDOWN_STATES = (GameState.PLANT_PHASE, GameState.DEFUSE_PHASE)
+
+
+class TelemetryRecorder:
+    """
+    Records a session of play to TELEMETRY_DIR/session-<time>.btl.
+
+    Every key event, state change and wrong entry becomes one 16-byte
+    record stamped with the game time and the countdown left. For replays
+    (python -m bomb_app.replay) it also records the step rate, the step
+    each countdown ran out on, and the countdown clock's drift from the
+    logic steps when a countdown starts or stalls past
+    TELEMETRY_CLOCK_STALL_MS. Records are
+    packed into a buffer and appended to the file when it fills up and at
+    the end of each round. Only the last TELEMETRY_KEEP_SESSIONS files are
+    kept. Read them with python -m bomb_app.telemetry.
+    """
+    def __init__(self, directory=None, buffer_records=None):
+        self.directory = directory or config.TELEMETRY_DIR
+        self.buffer_records = buffer_records or config.TELEMETRY_BUFFER_RECORDS
+        self._buffer = bytearray(RECORD.size * self.buffer_records)
+        self._used = 0
+        self._file = None
+        self.path = None
+        self.engine = None
+        self._left_state = None
+        self._left_timer_ms = -1
+        self._logic_hz = None
+        self._boot_video = None
+        self._clock_base_ns = 0  # Countdown clock minus game time when the countdown started
+        self._clock_written_ns = 0  # Drift since then in the last CLOCK record
+
+    def attach(self, engine):
+        """Start a session file and record engine's state changes"""
+        self.engine = engine
+        os.makedirs(self.directory, exist_ok=True)
+        self._rotate()
+        self.path = os.path.join(self.directory, time.strftime("session-%Y%m%d-%H%M%S.btl"))
+        suffix = 1
+        while os.path.exists(self.path):
+            suffix += 1
+            self.path = os.path.join(self.directory, time.strftime(f"session-%Y%m%d-%H%M%S-{suffix}.btl"))
+        self._file = open(self.path, "ab")
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, RECORD.size, time.time()))
+        engine.sm.on_exit(None, self._on_exit)
+        engine.sm.on_enter(None, self._on_enter)
+
+    def _rotate(self):
+        sessions = sorted(glob.glob(os.path.join(self.directory, "session-*.btl")))
+        for path in sessions[:max(0, len(sessions) - config.TELEMETRY_KEEP_SESSIONS + 1)]:
+            os.remove(path)
+
+    def record(self, kind, code=0, extra=0, timer_ms=None):
+        if self._file is None:
+            return
+        sm = self.engine.sm
+        if timer_ms is None:
+            timer_ms = sm.remaining_ms() if sm.counting else -1
+        RECORD.pack_into(self._buffer, self._used, self.engine.time, kind, code, extra, timer_ms)
+        self._used += RECORD.size
+        if self._used == len(self._buffer):
+            self.flush()
+
+    def tick(self, dt):
+        """Called at the start of every logic step"""
+        engine = self.engine
+        if self._logic_hz is None:
+            self._logic_hz = round(1.0 / dt)
+        if engine.has_boot_video != self._boot_video:
+            self._boot_video = engine.has_boot_video
+            self.record(SETUP, 1 if self._boot_video else 0, self._logic_hz)
+        if engine.sm.counting:
+            drift_ns = self._drift_ns()
+            if abs(drift_ns - self._clock_written_ns) >= config.TELEMETRY_CLOCK_STALL_MS * 1000000:
+                self._record_clock(drift_ns)  # A stall or a pause, not frame jitter
+
+    def _drift_ns(self):
+        return self.engine.sm.clock.now_ns() - round(self.engine.time * 1e9) - self._clock_base_ns
+
+    def _record_clock(self, drift_ns):
+        drift_us = max(-2**31, min(2**31 - 1, drift_ns // 1000))
+        self._clock_written_ns = drift_us * 1000
+        self.record(CLOCK, timer_ms=drift_us)
+
+    def key(self, key_event):
+        self.record(KEY, ord(key_event.key[0]), 1 if key_event.pressed else 0)
+
+    def _on_exit(self):
+        sm = self.engine.sm
+        self._left_state = sm.state
+        self._left_timer_ms = sm.remaining_ms() if sm.counting else -1
+
+    def _on_enter(self):
+        sm = self.engine.sm
+        new_state = sm.state
+        if sm.last_event == "timer_expired":
+            self.record(TIMEOUT, timer_ms=0)
+        if new_state in COUNTDOWN_STATES:
+            # Drift is counted from here: a replay starts the countdown on the step's own time
+            self._clock_base_ns = 0
+            self._clock_base_ns = self._drift_ns()
+            self._record_clock(0)
+        self.record(STATE, new_state.value, self._left_state.value, self._left_timer_ms)
+        if new_state in END_STATES:
+            self.flush()  # Round over: a power cut now loses nothing
+
+    def flush(self):
+        if self._used and self._file is not None:
+            self._file.write(self._buffer[:self._used])
+            self._file.flush()
+        self._used = 0
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def read_session(path):
+    """The records of one session file as (t, kind, code, extra, timer_ms) tuples, without NumPy"""
+    with open(path, "rb") as f:
+        magic, version, record_size, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC or version != FILE_VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a telemetry file")
+        data = f.read()
+    data = data[:len(data) - len(data) % RECORD.size]  # A record cut short by a power loss is dropped
+    return list(RECORD.iter_unpack(data))
+
+
+def load_records(paths):
+    """All records of the session files as one NumPy structured array, plus a per-record session index"""
+    import numpy as np
+    dtype = np.dtype(NUMPY_RECORD)
+    arrays, sessions = [], []
+    for session, path in enumerate(paths):
+        with open(path, "rb") as f:
+            magic, version, record_size, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if magic != FILE_MAGIC or version != FILE_VERSION or record_size != dtype.itemsize:
+                print(f"[WARNING] Skipping {path}: not a telemetry file")
+                continue
+            records = np.fromfile(f, dtype=dtype)  # A record cut short by a power loss is dropped
+        arrays.append(records)
+        sessions.append(np.full(len(records), session, dtype=np.int32))
+    if not arrays:
+        return np.zeros(0, dtype=dtype), np.zeros(0, dtype=np.int32)
+    return np.concatenate(arrays), np.concatenate(sessions)
+
+
+def round_stats(records, sessions):
+    """Per-round statistics, computed over all records at once"""
+    import numpy as np
+    states = records[records["kind"] == STATE]
+    state_sessions = sessions[records["kind"] == STATE]
+    new, old = states["code"], states["extra"]
+    # Time spent in the state being left: gap to the previous state record of the same session
+    spent = np.full(len(states), np.nan)
+    if len(states) > 1:
+        same_session = state_sessions[1:] == state_sessions[:-1]
+        spent[1:] = np.where(same_session, np.diff(states["t"]), np.nan)
+
+    plant, defuse = GameState.PLANT_PHASE.value, GameState.DEFUSE_PHASE.value
+    armed = (old == plant) & (new == defuse)
+    defused = (old == defuse) & (new == GameState.DEFUSED.value)
+    kinds = records["kind"]
+    return {
+        "sessions": int(len(np.unique(sessions))),
+        "rounds": int(np.count_nonzero(new == plant)),
+        "outcomes": {state.name: int(np.count_nonzero(new == state.value)) for state in END_STATES},
+        "time_to_plant": spent[armed],
+        "time_to_defuse": spent[defused],
+        "defuse_left_ms": states["timer_ms"][defused],
+        "wrong_pins": int(np.count_nonzero(kinds == WRONG_PIN)),
+        "wrong_phones": int(np.count_nonzero(kinds == WRONG_PHONE)),
+        "reveals": int(np.count_nonzero(kinds == REVEAL)),
+        "key_presses": int(np.count_nonzero((kinds == KEY) & (records["extra"] == 1))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Statistics over recorded telemetry sessions")
+    parser.add_argument("paths", nargs="*", help=f"Session files or directories (default: {config.TELEMETRY_DIR})")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.paths or [config.TELEMETRY_DIR]:
+        paths += sorted(glob.glob(os.path.join(path, "session-*.btl"))) if os.path.isdir(path) else [path]
+    if not paths:
+        print("No telemetry sessions found")
+        return 1
+
+    import numpy as np
+    start = time.perf_counter()
+    records, sessions = load_records(paths)
+    stats = round_stats(records, sessions)
+    elapsed = time.perf_counter() - start
+
+    print(f"{stats['sessions']} sessions, {stats['rounds']} rounds, {len(records)} records ({elapsed * 1000:.0f} ms)")
+    for outcome, count in stats["outcomes"].items():
+        print(f"  {outcome:10s}{count:8d}")
+    for name in ["time_to_plant", "time_to_defuse"]:
+        values = stats[name]
+        if len(values):
+            p50, p90 = np.percentile(values, [50, 90])
+            print(f"  {name:16s} mean {values.mean():6.1f}s  p50 {p50:6.1f}s  p90 {p90:6.1f}s")
+    rounds = max(1, stats["rounds"])
+    print(f"  wrong PINs {stats['wrong_pins']} ({stats['wrong_pins'] / rounds:.2f}/round), "
+          f"wrong phones {stats['wrong_phones']}, reveals {stats['reveals']}, key presses {stats['key_presses']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+"""
+Compiled boot animation container.
+
+Layout (little-endian):
+    header (64 bytes): magic, version, pixel format, width, height, fps,
+                       frame count, SHA-256 of the source video
+    frames:            frame_count * width * height * bytes_per_pixel, row-major
+
+Build it offline with:
+    python -m bomb_app.ui.boot_animation [--format RGB888|RGB565] [--force]
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import pygame
+from .. import config
+from .boot_video import FramePlayer, SCREEN_SIZE, to_rgb
+
+MAGIC = b"BANM"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBHHfI32s12x")  # 64 bytes
+
+FORMAT_RGB888 = 0
+FORMAT_RGB565 = 1
+FORMAT_NAMES = {"RGB888": FORMAT_RGB888, "RGB565": FORMAT_RGB565}
+BYTES_PER_PIXEL = {FORMAT_RGB888: 3, FORMAT_RGB565: 2}
+RGB565_MASKS = (0xF800, 0x07E0, 0x001F, 0)
+
+
+def file_hash(path):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def read_header(path):
+    """Return the header tuple of a compiled animation, or None if unreadable"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(data) != HEADER.size:
+        return None
+    header = HEADER.unpack(data)
+    if header[0] != MAGIC or header[1] != VERSION:
+        return None
+    return header
+
+
+def is_up_to_date(source_path, animation_path):
+    """True if animation_path was compiled from the current content of source_path"""
+    header = read_header(animation_path)
+    return header is not None and header[8] == file_hash(source_path)
+
+
+class BootAnimation(FramePlayer):
+    """
+    Memory-mapped compiled animation.
+    RGB888 frames are wrapped with pygame.image.frombuffer (zero copy);
+    RGB565 frames are copied into one reused 16-bit surface.
+    """
+    def __init__(self, path):
+        _, _, pixel_format, _, width, height, fps, frame_count, _ = read_header(path)
+        self.pixel_format = pixel_format
+        self.size = (width, height)
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frame_bytes = width * height * BYTES_PER_PIXEL[pixel_format]
+
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._surfaces = [None] * frame_count  # frombuffer wrappers, built on first use
+        self._surface_565 = None
+
+    def _frame_view(self, frame_number):
+        start = HEADER.size + frame_number * self.frame_bytes
+        return self._view[start:start + self.frame_bytes]
+
+    def get_frame(self, frame_number):
+        """Return frame as pygame surface backed by the mapped file"""
+        if frame_number < 0 or frame_number >= self.frame_count:
+            return None
+
+        if self.pixel_format == FORMAT_RGB888:
+            surface = self._surfaces[frame_number]
+            if surface is None:
+                surface = pygame.image.frombuffer(self._frame_view(frame_number), self.size, "RGB")
+                self._surfaces[frame_number] = surface
+            return surface
+
+        # RGB565: pygame has no 16-bit frombuffer, one memcpy into a reused surface
+        if self._surface_565 is None:
+            self._surface_565 = pygame.Surface(self.size, 0, 16, RGB565_MASKS)
+        self._surface_565.get_buffer().write(self._frame_view(frame_number).tobytes())
+        return self._surface_565
+
+    def close(self):
+        # Surfaces hold exports of the mapping, drop them before unmapping
+        self._surfaces = []
+        self._surface_565 = None
+        if self._view is not None:
+            self._view = None
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # A caller still holds a frame surface, the mapping is freed with it
+            self._file.close()
+
+
+def load_animation(path):
+    """Open a compiled animation, or return None if it is missing or invalid"""
+    if read_header(path) is None:
+        print(f"[WARNING] Invalid boot animation: {path}")
+        return None
+    try:
+        animation = BootAnimation(path)
+    except Exception as e:
+        print(f"[WARNING] Error loading boot animation: {e}")
+        return None
+    print(f"[INFO] Boot animation mapped: {animation.frame_count} frames at {animation.fps} FPS")
+    return animation
+
+
+def compile_animation(source_path, output_path, pixel_format=FORMAT_RGB888, force=False):
+    """
+    Transcode source_path into a compiled animation at output_path.
+    Skips the work when output_path already matches the source content hash.
+    Returns True if a file was written.
+    """
+    import cv2
+    import numpy as np
+
+    source_hash = file_hash(source_path)
+    header = read_header(output_path)
+    if not force and header is not None and header[8] == source_hash and header[2] == pixel_format:
+        print(f"[INFO] Boot animation up to date: {output_path}")
+        return False
+
+    cap = cv2.VideoCapture(source_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {source_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30  # Fallback
+
+    # Write to a temp file and swap in, so a running device never maps a half-written file
+    tmp_path = output_path + ".tmp"
+    frame_count = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * HEADER.size)  # Placeholder until frame count is known
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame = to_rgb(frame)
+                if pixel_format == FORMAT_RGB565:
+                    r = frame[:, :, 0].astype(np.uint16)
+                    g = frame[:, :, 1].astype(np.uint16)
+                    b = frame[:, :, 2].astype(np.uint16)
+                    frame = ((r >> 3) << 11 | (g >> 2) << 5 | (b >> 3)).astype("<u2")
+                f.write(np.ascontiguousarray(frame).tobytes())
+                frame_count += 1
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, pixel_format, 0, SCREEN_SIZE[0], SCREEN_SIZE[1],
+                                fps, frame_count, source_hash))
+        os.replace(tmp_path, output_path)
+    finally:
+        cap.release()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"[INFO] Boot animation compiled: {frame_count} frames at {fps} FPS -> {output_path}")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the boot video into a raw frame container")
+    parser.add_argument("--source", default=config.BOOT_VIDEO_PATH)
+    parser.add_argument("--output", default=config.BOOT_ANIMATION_PATH)
+    parser.add_argument("--format", choices=sorted(FORMAT_NAMES), default=config.BOOT_ANIMATION_FORMAT)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the source is unchanged")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"[ERROR] Boot video not found at: {args.source}")
+        return 1
+    compile_animation(args.source, args.output, FORMAT_NAMES[args.format], args.force)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+from abc import ABC, abstractmethod
+import os
+import queue
+import tempfile
+import threading
+import pygame
+from .. import config
+
+SCREEN_SIZE = (240, 320)  # Portrait (width, height)
+
+
+def to_rgb(frame):
+    """Convert an OpenCV BGR frame into a (height, width, 3) RGB array at screen size"""
+    import cv2
+
+    # Convert BGR to RGB
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    # Resize to fit screen if needed (240x320 portrait)
+    if frame.shape[1] != SCREEN_SIZE[0] or frame.shape[0] != SCREEN_SIZE[1]:
+        frame = cv2.resize(frame, SCREEN_SIZE, interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def convert_frame(frame):
+    """Convert an OpenCV BGR frame into a (width, height, 3) RGB array for pygame"""
+    # Swap axes: (height, width, channels) -> (width, height, channels)
+    return to_rgb(frame).transpose((1, 0, 2))
+
+
+class FramePlayer(ABC):
+    """Time-based playback over random-access frames (get_frame)"""
+    fps = 30
+    frame_count = 0
+    frame_index = -1  # Last frame returned by frame_at
+
+    @abstractmethod
+    def get_frame(self, frame_number):
+        """Surface for frame_number"""
+
+    def frame_at(self, play_time):
+        """Frame for play_time seconds into the video, frozen on the last frame at the end"""
+        self.frame_index = min(int(play_time * self.fps), self.frame_count - 1)
+        return self.get_frame(self.frame_index)
+
+    def close(self):
+        pass
+
+
+class BootVideo(FramePlayer):
+    """
+    Boot video decoded once, sequentially, at load time.
+    Frames are kept as ready-to-blit surfaces while they fit in
+    config.BOOT_VIDEO_MEMORY_BUDGET_MB; the rest spill into a memory-mapped
+    RGB array on disk, so playback never seeks or runs colour conversion.
+    """
+    def __init__(self, fps, frame_count):
+        self.fps = fps
+        self.frame_count = frame_count
+        self.surfaces = []  # Frames kept in memory
+        self.spill = None  # np.memmap (n, width, height, 3) for frames past the budget
+        self.spill_path = None
+        self._spill_surface = None  # Reused surface for spilled frames
+
+    def get_frame(self, frame_number):
+        """Return frame as pygame surface (no decode, no seek)"""
+        if frame_number < 0 or frame_number >= self.frame_count:
+            return None
+        if frame_number < len(self.surfaces):
+            return self.surfaces[frame_number]
+
+        # Spilled frame: copy the RGB block straight into a reused surface
+        if self._spill_surface is None:
+            self._spill_surface = pygame.Surface(SCREEN_SIZE)
+        pygame.surfarray.blit_array(self._spill_surface, self.spill[frame_number - len(self.surfaces)])
+        return self._spill_surface
+
+    def close(self):
+        self.surfaces = []
+        self.spill = None  # Drop the mapping before removing the file
+        if self.spill_path is not None:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+
+def load_video(video_path, memory_budget_mb=None):
+    """Decode video into a BootVideo, or return None if file doesn't exist"""
+    if not os.path.exists(video_path):
+        print(f"[WARNING] Boot video not found at: {video_path}")
+        return None
+    if memory_budget_mb is None:
+        memory_budget_mb = config.BOOT_VIDEO_MEMORY_BUDGET_MB
+
+    try:
+        import cv2
+        import numpy as np
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"[WARNING] Could not open video: {video_path}")
+            return None
+    except Exception as e:
+        print(f"[WARNING] Error loading video: {e}")
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 0:
+        fps = 30  # Fallback
+    expected_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    frame_bytes = SCREEN_SIZE[0] * SCREEN_SIZE[1] * 3
+    max_in_memory = int(memory_budget_mb * 1024 * 1024) // frame_bytes
+
+    video = BootVideo(fps, 0)
+    spilled = 0
+    try:
+        # Sequential decode only: no CAP_PROP_POS_FRAMES seeks
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame = convert_frame(frame)
+
+            if len(video.surfaces) < max_in_memory:
+                video.surfaces.append(pygame.surfarray.make_surface(frame))
+                continue
+
+            if video.spill is None:
+                # Size the spill file from the container frame count (may over-estimate)
+                spill_frames = max(expected_frames - len(video.surfaces), 1)
+                fd, video.spill_path = tempfile.mkstemp(prefix="boot_video_", suffix=".rgb")
+                os.close(fd)
+                video.spill = np.memmap(video.spill_path, dtype=np.uint8, mode="w+",
+                                        shape=(spill_frames, SCREEN_SIZE[0], SCREEN_SIZE[1], 3))
+            if spilled >= video.spill.shape[0]:
+                break  # Container lied about frame count, stop at what fits
+            video.spill[spilled] = frame
+            spilled += 1
+    finally:
+        cap.release()
+
+    if video.spill is not None:
+        video.spill.flush()
+    video.frame_count = len(video.surfaces) + spilled
+
+    if video.frame_count == 0:
+        print(f"[WARNING] Boot video has no frames: {video_path}")
+        video.close()
+        return None
+
+    print(f"[INFO] Boot video decoded: {video.frame_count} frames at {fps} FPS "
+          f"({len(video.surfaces)} in memory, {spilled} memory-mapped)")
+    return video
+
+
+class BootVideoStream:
+    """
+    Boot video decoded ahead by a producer thread into a bounded queue of
+    ready-to-blit surfaces. The game loop only pops frames (frame_at) and
+    never waits on the decoder: late frames are dropped, and the current
+    frame is repeated when the decoder has not caught up.
+
+    OpenCV is imported and the file opened on the decoder thread too, so the
+    first frames of the game come up without waiting for it; frame_at()
+    returns None until the video is ready, and playback starts from there.
+    failed is set if the video can't be opened.
+    """
+    def __init__(self, video_path, queue_size):
+        self.video_path = video_path
+        self.fps = None  # Known once the decoder has opened the file
+        self.failed = False
+        self._ready = threading.Event()
+        self._start_time = None  # play_time at which the first frame was shown
+        self._cap = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._target_index = 0  # Frame the consumer wants now, lets the decoder skip late frames
+        self._current_index = -1
+        self._current_surface = None
+        self.frame_index = -1  # Last frame returned by frame_at
+        self.frames_dropped = 0
+        self._thread = threading.Thread(target=self._decode_loop, name="boot-video-decoder", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def wait_ready(self, timeout=None):
+        """Block until the decoder has opened the video (or failed), True if playable"""
+        self._ready.wait(timeout)
+        return self._ready.is_set() and not self.failed
+
+    def _open(self):
+        try:
+            import cv2
+            cap = cv2.VideoCapture(self.video_path)
+            if not cap.isOpened():
+                print(f"[WARNING] Could not open video: {self.video_path}")
+                return False
+        except Exception as e:
+            print(f"[WARNING] Error loading video: {e}")
+            return False
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps > 0 else 30  # Fallback
+        self._cap = cap
+        print(f"[INFO] Boot video streaming at {self.fps} FPS (queue {self._queue.maxsize} frames)")
+        return True
+
+    def _decode_loop(self):
+        if not self._open():
+            self.failed = True
+            self._ready.set()
+            return
+        self._ready.set()
+        index = 0
+        try:
+            while not self._stop.is_set():
+                if index < self._target_index:
+                    # Already late for this frame: advance without decoding or converting it
+                    if not self._cap.grab():
+                        break
+                    index += 1
+                    continue
+
+                ret, frame = self._cap.read()
+                if not ret:
+                    break
+                surface = pygame.surfarray.make_surface(convert_frame(frame))
+
+                # Bounded put, re-checking stop so the thread exits promptly
+                while not self._stop.is_set():
+                    try:
+                        self._queue.put((index, surface), timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                index += 1
+        finally:
+            self._cap.release()
+
+    def frame_at(self, play_time):
+        """Latest decoded frame for play_time seconds into the video"""
+        if not self._ready.is_set() or self.failed:
+            return None
+        if self._start_time is None:
+            self._start_time = play_time  # Opened late: play from the start anyway
+        target = int((play_time - self._start_time) * self.fps)
+        self._target_index = target
+        previous_index = self._current_index
+        while self._current_index < target:
+            try:
+                index, surface = self._queue.get_nowait()
+            except queue.Empty:
+                break  # Decoder behind: repeat the current frame
+            self._current_index = index
+            self._current_surface = surface
+        if previous_index >= 0 and self._current_index > previous_index + 1:
+            self.frames_dropped += self._current_index - previous_index - 1
+        self.frame_index = self._current_index
+        return self._current_surface
+
+    def close(self):
+        """Stop the decoder thread and release the capture"""
+        self._stop.set()
+        if self._thread.is_alive() and self._ready.is_set():
+            self._thread.join()  # Still importing OpenCV: it exits on its own once open
+        self._current_surface = None
+        # Drain so queued surfaces are freed right away
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+
+def stream_video(video_path, queue_size=None):
+    """Open video for background decoding, or return None if file doesn't exist"""
+    if not os.path.exists(video_path):
+        print(f"[WARNING] Boot video not found at: {video_path}")
+        return None
+    if queue_size is None:
+        queue_size = config.BOOT_VIDEO_QUEUE_SIZE
+
+    stream = BootVideoStream(video_path, queue_size)
+    stream.start()
+    return stream
+
+
+def open_boot_video():
+    """
+    Open the boot video for playback.
+    Prefers the compiled animation (config.BOOT_ANIMATION_PATH, no OpenCV needed)
+    and falls back to decoding config.BOOT_VIDEO_PATH when it is missing or stale,
+    either in a background thread or up front (config.BOOT_VIDEO_MODE).
+    """
+    from .boot_animation import load_animation, is_up_to_date
+
+    if os.path.exists(config.BOOT_ANIMATION_PATH):
+        if not os.path.exists(config.BOOT_VIDEO_PATH) or is_up_to_date(config.BOOT_VIDEO_PATH, config.BOOT_ANIMATION_PATH):
+            animation = load_animation(config.BOOT_ANIMATION_PATH)
+            if animation is not None:
+                return animation
+        else:
+            print("[WARNING] Boot animation is out of date, run: python -m bomb_app.ui.boot_animation")
+    if config.BOOT_VIDEO_MODE == "stream":
+        return stream_video(config.BOOT_VIDEO_PATH)
+    return load_video(config.BOOT_VIDEO_PATH)
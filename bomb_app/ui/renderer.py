@@ -1,180 +1,378 @@
+import threading
 import pygame
+from collections import OrderedDict
 from .. import config
 
+# Renderer font attributes: (system font, size, bold)
+FONTS = {
+    "font_header": ("Arial", 30, True),
+    "font_large": ("Arial", 40, True),
+    "font_medium": ("Arial", 25, False),
+    "font_small": ("Arial", 18, False),
+    "font_countdown": ("Arial", 50, True),
+}
+
 class Renderer:
     def __init__(self):
-        pygame.init()
+        # Only the subsystems we use: pygame.init() also opens audio and joysticks (slow on the Pi)
+        pygame.display.init()
+        pygame.font.init()
         # 240x320 Portrait
         self.width = 240
         self.height = 320
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Airsoft Bomb")
         
-        # Fonts
-        self.font_header = pygame.font.SysFont("Arial", 30, bold=True)        
-        self.font_large = pygame.font.SysFont("Arial", 40, bold=True)
-        self.font_medium = pygame.font.SysFont("Arial", 25)
-        self.font_small = pygame.font.SysFont("Arial", 18)
-        self.font_countdown = pygame.font.SysFont("Arial", 50, bold=True)
+        # Fonts are created on first use (see __getattr__). Finding system fonts
+        # runs fc-list, so that scan starts now in the background instead of
+        # holding up the first frame (the boot video needs no text).
+        self._font_scan = threading.Thread(target=pygame.font.get_fonts, name="font-scan", daemon=True)
+        self._font_scan.start()
+
+        # Rendered text surfaces, keyed by (text, font, color), least recently used first
+        self._text_cache = OrderedDict()
+
+        # Retained mode: draw calls are recorded as ops and replayed in update().
+        # Each op is (kind, payload, rect); comparing against the previous frame's
+        # ops gives the regions that changed.
+        self._ops = []
+        self._prev_ops = []
+        self.screen_rect = (0, 0, self.width, self.height)
+
+        # Translucent overlays in display pixel format, keyed by (color, alpha)
+        self._overlays = {}
+        for color in [config.COLOR_YELLOW, config.COLOR_RED]:
+            self.get_overlay(color, 80)  # PLANT/DEFUSE blink
+
+        # Static screen layers per (GameState, screen_blink), see get_layer()
+        self._layers = {}
+        self._console_layer = None
 
+        # Debug HUD, created on first use
+        self.font_hud = None
+        self._hud_background = None
         
+    def __getattr__(self, name):
+        # Only called for attributes not set yet: create a font on first use
+        if name not in FONTS:
+            raise AttributeError(name)
+        self._font_scan.join()
+        font_name, size, bold = FONTS[name]
+        font = pygame.font.SysFont(font_name, size, bold=bold)
+        setattr(self, name, font)
+        return font
+
     def clear(self):
-        self.screen.fill(config.COLOR_BLACK)
+        self._ops.append(("fill", config.COLOR_BLACK, self.screen_rect))
+
+    def blit(self, surface, pos):
+        self._ops.append(("blit", surface, (pos[0], pos[1], surface.get_width(), surface.get_height())))
+
+    def draw_rect(self, color, rect, width=0):
+        self._ops.append(("rect", (color, width), tuple(rect)))
+
+    def get_overlay(self, color, alpha):
+        """Full screen (color, alpha) overlay from the pool, allocated and converted once"""
+        key = (color, alpha)
+        overlay = self._overlays.get(key)
+        if overlay is None:
+            overlay = pygame.Surface((self.width, self.height)).convert()
+            overlay.fill(color)
+            overlay.set_alpha(alpha)
+            self._overlays[key] = overlay
+        return overlay
+
+    def draw_overlay(self, color, alpha):
+        """Full screen translucent color overlay"""
+        self._ops.append(("overlay", (color, alpha), self.screen_rect))
         
     def draw_console_overlay(self, logs):
-        """Draw 80% transparent black overlay with log messages"""
-        overlay = pygame.Surface((self.width, self.height))
-        overlay.set_alpha(204)  # ~80% transparency (255 * 0.8 = 204)
-        overlay.fill(config.COLOR_BLACK)
-        self.screen.blit(overlay, (0, 0))
-        
-        # Border
-        pygame.draw.rect(self.screen, config.COLOR_GREEN, (10, 10, self.width - 20, self.height - 20), 2)
-        
-        # Title
-        self.draw_text("SYSTEM CONSOLE", self.font_medium, config.COLOR_GREEN, (self.width // 2, 30))
+        """Draw 80% transparent black overlay with log messages (LogRecords, read in place)"""
+        self.blit(self.get_console_layer(), (0, 0))
         
         # Draw Logs
         x_start = 20
         y_start = 60
         line_height = 20
         
-        for i, log_msg in enumerate(logs):
-            surface = self.font_small.render(f"> {log_msg}", True, config.COLOR_GREEN)
-            self.screen.blit(surface, (x_start, y_start + i * line_height))
+        for i, record in enumerate(logs):
+            surface = self.render_text(f"> {record.message}", self.font_small, config.COLOR_GREEN)
+            self.blit(surface, (x_start, y_start + i * line_height))
+
+    def draw_debug_hud(self, lines):
+        """Small translucent box with profiler lines in the top-left corner"""
+        if self.font_hud is None:
+            self._font_scan.join()
+            self.font_hud = pygame.font.SysFont("Courier", 12, bold=True)
+        line_height = self.font_hud.get_linesize()
+        height = line_height * len(lines) + 4
+        if self._hud_background is None or self._hud_background.get_height() != height:
+            self._hud_background = pygame.Surface((self.width, height)).convert()
+            self._hud_background.set_alpha(180)
+        self.blit(self._hud_background, (0, 0))
+        for i, line in enumerate(lines):
+            self.blit(self.render_text(line, self.font_hud, config.COLOR_YELLOW), (4, 2 + i * line_height))
+
+    def _replay(self, ops):
+        for kind, payload, rect in ops:
+            if kind == "blit":
+                self.screen.blit(payload, rect[:2])
+            elif kind == "frame":
+                self.screen.blit(payload[0], rect[:2])
+            elif kind == "fill":
+                self.screen.fill(payload, rect)
+            elif kind == "rect":
+                pygame.draw.rect(self.screen, payload[0], rect, payload[1])
+            elif kind == "overlay":
+                self.screen.blit(self.get_overlay(*payload), (0, 0))
+
+    def _dirty_rects(self, old_ops, new_ops):
+        """Screen regions covered by ops that appeared or disappeared since the last frame"""
+        changed = set(old_ops).symmetric_difference(new_ops)
+        if not changed:
+            if old_ops == new_ops:
+                return []
+            return [pygame.Rect(self.screen_rect)]  # Same ops, different stacking order
+        rects = []
+        for op in changed:
+            rect = pygame.Rect(op[2])
+            if rect.w <= 0 or rect.h <= 0:
+                continue  # Empty text
+            if rect.w >= self.width and rect.h >= self.height:
+                return [pygame.Rect(self.screen_rect)]
+            # Merge with any overlapping region so each pixel is redrawn once
+            for other in [r for r in rects if r.colliderect(rect)]:
+                rect.union_ip(other)
+                rects.remove(other)
+            rects.append(rect)
+        if len(rects) > 8:
+            return [rects[0].unionall(rects[1:])]  # Many small regions: one bounding push is cheaper
+        return rects
 
     def update(self):
-        pygame.display.flip()
-        
-    def draw_text(self, text, font, color, center_pos):
+        ops = self._ops
+        self._ops = []
+
+        if not config.RENDER_DIRTY_RECTS:
+            self._replay(ops)
+            self._prev_ops = ops
+            pygame.display.flip()
+            return
+
+        dirty = self._dirty_rects(self._prev_ops, ops)
+        self._prev_ops = ops
+        if not dirty:
+            return  # Nothing changed, push nothing
+
+        # Redraw only inside the changed regions, then push just those
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            self._replay(ops)
+        self.screen.set_clip(None)
+        pygame.display.update(dirty)
+
+    def render_text(self, text, font, color):
+        """Return text surface from the LRU cache, rasterising only on a miss"""
+        key = (text, font, color)
+        surface = self._text_cache.get(key)
+        if surface is not None:
+            self._text_cache.move_to_end(key)
+            return surface
+
         surface = font.render(text, True, color)
+        self._text_cache[key] = surface
+        if len(self._text_cache) > config.TEXT_CACHE_SIZE:
+            self._text_cache.popitem(last=False)
+        return surface
+
+    def draw_text(self, text, font, color, center_pos):
+        surface = self.render_text(text, font, color)
         rect = surface.get_rect(center=(center_pos[0], center_pos[1]))
-        self.screen.blit(surface, rect)
+        self.blit(surface, rect.topleft)
+
+    def draw_countdown(self, time_str, font, color, center_pos):
+        """Draw MM:SS.mmm from cached per-glyph surfaces instead of rasterising the whole string"""
+        glyphs = [self.render_text(ch, font, color) for ch in time_str]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        height = max(glyph.get_height() for glyph in glyphs)
+        x = center_pos[0] - width // 2
+        y = center_pos[1] - height // 2
+        for glyph in glyphs:
+            self.blit(glyph, (x, y))
+            x += glyph.get_width()
         
-    def render(self, state_machine, current_input="", input_label="INPUT", screen_blink=False, text_blink=False, video_frame=None):
+    def _draw_static(self, state, screen_blink):
+        """Parts of a GameState screen that never change between frames"""
+        from ..state_machine import GameState
+
         self.clear()
-        state = state_machine.state
         
         # Header (Top Bar)
-        pygame.draw.rect(self.screen, (30, 30, 30), (0, 0, self.width, 40))
+        self.draw_rect((30, 30, 30), (0, 0, self.width, 40))
 
         # Content Area
         cx = self.width // 2
         cy = self.height // 2
-        
-        from ..state_machine import GameState
-        
-        if state == GameState.BOOT:
-            # Display video frame (fullscreen, no header)
-            if video_frame is not None:
-                # video_frame is already a pygame surface, just blit it
-                self.screen.blit(video_frame, (0, 0))
-            else:
-                # Fallback if no frame provided
-                self.clear()
-            return  # Skip header drawing for boot screen
-        
+
         if state == GameState.PIN_TYPE_SELECT:
             self.draw_text("PIN MODE", self.font_header, config.COLOR_WHITE, (self.width//2, 20))
             self.draw_text("1: STATIC PIN", self.font_medium, config.COLOR_WHITE, (cx, 80))
             self.draw_text("2: DYNAMIC PIN", self.font_medium, config.COLOR_WHITE, (cx, 120))
             self.draw_text("3: TELEGRAM PIN", self.font_medium, config.COLOR_WHITE, (cx, 160))
-            self.draw_text(f"CHOICE: {current_input}", self.font_large, config.COLOR_GREEN, (cx, 220))
             self.draw_text("PRESS # TO CONFIRM", self.font_small, config.COLOR_WHITE, (cx, 280))
 
         elif state == GameState.PLAYER_REGISTRATION:
             self.draw_text("REGISTRATION", self.font_header, config.COLOR_WHITE, (self.width//2, 20))
-            self.draw_text(input_label, self.font_medium, config.COLOR_WHITE, (cx, 100))
-            self.draw_text(current_input, self.font_large, config.COLOR_GREEN, (cx, 160))
             self.draw_text("PRESS # TO REGISTER", self.font_small, config.COLOR_WHITE, (cx, 240))
             self.draw_text("PRESS * TO FINISH", self.font_small, config.COLOR_WHITE, (cx, 270))
-            # Show small list of already registered?
-            count = len(state_machine.player_phones)
-            self.draw_text(f"REGISTERED: {count}", self.font_small, config.COLOR_YELLOW, (cx, 300))
 
         elif state == GameState.CONFIG:
-            # Header text
             self.draw_text("GAME SETUP", self.font_header, config.COLOR_WHITE, (self.width//2, 20))
-            # Content Area
-            self.draw_text(f"PLANT TIME: {state_machine.plant_time}s", self.font_medium, config.COLOR_WHITE, (cx, 80))
-            self.draw_text(f"DEFUSE TIME: {state_machine.defuse_time}s", self.font_medium, config.COLOR_WHITE, (cx, 120))
-            self.draw_text(f"{input_label}", self.font_medium, config.COLOR_GREEN, (cx, 170))
-            self.draw_text(f"{current_input}", self.font_large, config.COLOR_GREEN, (cx, 220))
             self.draw_text("PRESS # TO CONFIRM", self.font_small, config.COLOR_WHITE, (cx, 270))
             self.draw_text("HOLD # (2s) TO RESET", self.font_small, (100, 100, 100), (cx, 300))
-            
+
         elif state == GameState.READY:
-            # Header text
             self.draw_text("GAME READY", self.font_header, config.COLOR_GREEN, (self.width//2, 20))
-            # Content Area
             self.draw_text("PRESS * TO START", self.font_medium, config.COLOR_WHITE, (cx, cy - 30))
             self.draw_text("START", self.font_large, config.COLOR_WHITE, (cx, cy + 30))
             self.draw_text("HOLD # (2s) TO RESET", self.font_small, (100, 100, 100), (cx, 300))
-            
+
         elif state == GameState.PLANT_PHASE:
             # Screen blink effect (yellow overlay)
             if screen_blink:
-                overlay = pygame.Surface((self.width, self.height))
-                overlay.set_alpha(80)  # Semi-transparent
-                overlay.fill(config.COLOR_YELLOW)
-                self.screen.blit(overlay, (0, 0))
-            
-            # Header text
+                self.draw_overlay(config.COLOR_YELLOW, 80)  # Semi-transparent
             self.draw_text("PLANT BOMB", self.font_header, config.COLOR_YELLOW, (self.width//2, 20))
-            # Content Area
-            time_str = state_machine.get_time_string() # Timer
-            self.draw_text(time_str, self.font_countdown, config.COLOR_WHITE, (cx, cy - 60))
             self.draw_text("TO DEADLINE", self.font_medium, config.COLOR_YELLOW, (cx, cy))
             self.draw_text("PRESS * TO ENTER CODE", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
-            self.draw_text(current_input, self.font_large, config.COLOR_YELLOW, (cx, cy + 120))
-            
+
         elif state == GameState.DEFUSE_PHASE:
             # Screen blink effect (red overlay)
             if screen_blink:
-                overlay = pygame.Surface((self.width, self.height))
-                overlay.set_alpha(80)  # Semi-transparent
-                overlay.fill(config.COLOR_RED)
-                self.screen.blit(overlay, (0, 0))
-            
-            # Header text
+                self.draw_overlay(config.COLOR_RED, 80)  # Semi-transparent
             self.draw_text("ARMED!", self.font_header, config.COLOR_RED, (self.width//2, 20))
-            # Content Area
-            time_str = state_machine.get_time_string()
-            self.draw_text(time_str, self.font_countdown, config.COLOR_RED, (cx, cy - 60))
             self.draw_text("TO KABOOM", self.font_medium, config.COLOR_YELLOW, (cx, cy))
-            self.draw_text(f"{input_label}", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
-            self.draw_text(current_input, self.font_large, config.COLOR_WHITE, (cx, cy + 120))
 
         elif state == GameState.EXPLODED:
-            # Header text
             self.draw_text("BOOM!", self.font_header, config.COLOR_RED, (self.width//2, 20))
-            # Content Area
             self.draw_text("TARGET", self.font_large, config.COLOR_RED, (cx, cy - 60))
-            if not text_blink:  # Only show when not blinking (creates blink effect)
-                self.draw_text("DESTROYED", self.font_large, config.COLOR_RED, (cx, cy))
             self.draw_text("MASKS OFF!", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
-            
+
         elif state == GameState.DEFUSED:
-            # Header text
             self.draw_text("DEFUSED!", self.font_header, config.COLOR_RED, (self.width//2, 20))
-            # Content Area
             self.draw_text("MISSION", self.font_large, config.COLOR_GREEN, (cx, cy - 60))
-            if not text_blink:  # Only show when not blinking (creates blink effect)
-                self.draw_text("SUCCESS", self.font_large, config.COLOR_GREEN, (cx, cy))
             self.draw_text("COUNTER-TERRORISTS WIN", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
 
         elif state == GameState.TIME_OUT:
-            # Header text
             self.draw_text("TIME OUT!", self.font_header, config.COLOR_RED, (self.width//2, 20))
-            # Content Area  
             self.draw_text("TERRORISTS", self.font_medium, config.COLOR_YELLOW, (cx, cy - 60))
-            if not text_blink:  # Only show when not blinking (creates blink effect)
-                self.draw_text("FAILED", self.font_large, config.COLOR_YELLOW, (cx, cy))
             self.draw_text("TRY RUSH B", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
-            
+
         if state in [GameState.EXPLODED, GameState.DEFUSED, GameState.TIME_OUT]:
             self.draw_text("PRESS # TO PLAY AGAIN", self.font_small, config.COLOR_WHITE, (cx, 270))
             self.draw_text("HOLD # (2s) TO RESET", self.font_small, (100, 100, 100), (cx, 300))
+
+    def _draw_console_static(self):
+        """Console overlay border and title (backdrop is filled by get_console_layer)"""
+        # Border
+        self.draw_rect(config.COLOR_GREEN, (10, 10, self.width - 20, self.height - 20), 2)
+        
+        # Title
+        self.draw_text("SYSTEM CONSOLE", self.font_medium, config.COLOR_GREEN, (self.width // 2, 30))
+
+    def _build_layer(self, draw, surface):
+        """Run draw() and composite the ops it records onto surface"""
+        ops = self._ops
+        self._ops = []
+        draw()
+        layer_ops = self._ops
+        self._ops = ops
+
+        screen = self.screen
+        self.screen = surface
+        self._replay(layer_ops)
+        self.screen = screen
+        return surface
+
+    def get_layer(self, state, screen_blink=False):
+        """Pre-composited static background for a GameState, built on first use"""
+        key = (state, screen_blink)
+        layer = self._layers.get(key)
+        if layer is None:
+            layer = self._build_layer(lambda: self._draw_static(state, screen_blink),
+                                      pygame.Surface((self.width, self.height)).convert())
+            self._layers[key] = layer
+        return layer
+
+    def get_console_layer(self):
+        """Pre-composited console overlay base: translucent backdrop, border and title"""
+        if self._console_layer is None:
+            surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA).convert_alpha()
+            surface.fill(config.COLOR_BLACK + (204,))  # ~80% transparency (255 * 0.8 = 204)
+            self._console_layer = self._build_layer(self._draw_console_static, surface)
+        return self._console_layer
+
+    def render(self, state_machine, current_input="", input_label="INPUT", screen_blink=False, text_blink=False, video_frame=None, video_frame_id=None):
+        state = state_machine.state
+
+        # Content Area
+        cx = self.width // 2
+        cy = self.height // 2
+        
+        from ..state_machine import GameState
+        
+        if state == GameState.BOOT:
+            # Display video frame (fullscreen, no header)
+            if video_frame is not None:
+                # video_frame is already a pygame surface, just blit it.
+                # Players may reuse one surface for every frame, so the frame id marks changes.
+                self._ops.append(("frame", (video_frame, video_frame_id), (0, 0, video_frame.get_width(), video_frame.get_height())))
+            else:
+                # Fallback if no frame provided
+                self.clear()
+            return  # Skip header drawing for boot screen
+
+        # Static parts (header, titles, hints, blink overlay) in a single blit
+        blink = screen_blink and state in [GameState.PLANT_PHASE, GameState.DEFUSE_PHASE]
+        self.blit(self.get_layer(state, blink), (0, 0))
+        
+        if state == GameState.PIN_TYPE_SELECT:
+            self.draw_text(f"CHOICE: {current_input}", self.font_large, config.COLOR_GREEN, (cx, 220))
+
+        elif state == GameState.PLAYER_REGISTRATION:
+            self.draw_text(input_label, self.font_medium, config.COLOR_WHITE, (cx, 100))
+            self.draw_text(current_input, self.font_large, config.COLOR_GREEN, (cx, 160))
+            # Show small list of already registered?
+            count = len(state_machine.players)
+            self.draw_text(f"REGISTERED: {count}", self.font_small, config.COLOR_YELLOW, (cx, 300))
+
+        elif state == GameState.CONFIG:
+            self.draw_text(f"PLANT TIME: {state_machine.plant_time}s", self.font_medium, config.COLOR_WHITE, (cx, 80))
+            self.draw_text(f"DEFUSE TIME: {state_machine.defuse_time}s", self.font_medium, config.COLOR_WHITE, (cx, 120))
+            self.draw_text(f"{input_label}", self.font_medium, config.COLOR_GREEN, (cx, 170))
+            self.draw_text(f"{current_input}", self.font_large, config.COLOR_GREEN, (cx, 220))
+            
+        elif state == GameState.PLANT_PHASE:
+            time_str = state_machine.get_time_string() # Timer
+            self.draw_countdown(time_str, self.font_countdown, config.COLOR_WHITE, (cx, cy - 60))
+            self.draw_text(current_input, self.font_large, config.COLOR_YELLOW, (cx, cy + 120))
+            
+        elif state == GameState.DEFUSE_PHASE:
+            time_str = state_machine.get_time_string()
+            self.draw_countdown(time_str, self.font_countdown, config.COLOR_RED, (cx, cy - 60))
+            self.draw_text(f"{input_label}", self.font_small, config.COLOR_WHITE, (cx, cy + 60))
+            self.draw_text(current_input, self.font_large, config.COLOR_WHITE, (cx, cy + 120))
+
+        elif state == GameState.EXPLODED:
+            if not text_blink:  # Only show when not blinking (creates blink effect)
+                self.draw_text("DESTROYED", self.font_large, config.COLOR_RED, (cx, cy))
+            
+        elif state == GameState.DEFUSED:
+            if not text_blink:  # Only show when not blinking (creates blink effect)
+                self.draw_text("SUCCESS", self.font_large, config.COLOR_GREEN, (cx, cy))
+
+        elif state == GameState.TIME_OUT:
+            if not text_blink:  # Only show when not blinking (creates blink effect)
+                self.draw_text("FAILED", self.font_large, config.COLOR_YELLOW, (cx, cy))
         
         # PIN TYPE 2/3 CONSOLE OVERLAY
         if state_machine.show_console:
@@ -1,6 +1,36 @@
 
 import unittest
-from bomb_app.state_machine import StateMachine, GameState
+from bomb_app.state_machine import StateMachine, GameState, TRANSITIONS
+from bomb_app.scheduler import FrameScheduler
+from bomb_app.clock import GameClock
+from bomb_app.hardware.buzzer import BuzzerDriver
+from bomb_app.hardware.keypad import KeyDebouncer, KeyEvent
+from bomb_app.telegram_outbox import TelegramOutbox
+from bomb_app.simulation import Simulator, ROUNDS, RecordingBuzzer, RecordingTelegram, press, setup_script, simulate
+from bomb_app.engine import GameEngine
+from bomb_app.profiler import FrameProfiler, ToggleChord, PHASES, read_ring
+from bomb_app.netsync import NetSync
+from bomb_app.players import PlayerRegistry, RegistrationError
+from bomb_app.telemetry import TelemetryRecorder, load_records, round_stats, read_session, FILE_HEADER, RECORD, KEY, CLOCK
+from bomb_app.replay import replay
+from bomb_app.ui import boot_video, boot_animation
+from bomb_app.ui.renderer import Renderer
+from bomb_app import config
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pygame
+try:
+    import requests
+except ImportError:
+    requests = None
 
 class TestStateMachine(unittest.TestCase):
     def test_flow(self):
@@ -33,5 +63,797 @@ class TestStateMachine(unittest.TestCase):
         sm.tick(1.5)
         self.assertEqual(sm.state, GameState.EXPLODED)
 
+    def test_countdown_uses_deadlines(self):
+        now = [0]
+        sm = StateMachine(GameClock(source=lambda: now[0]))
+        sm.set_times(60, 60)
+        sm.transition_to(GameState.PLANT_PHASE)
+
+        # 1000 uneven steps plus a 5s stall: the time left only depends on the clock
+        for i in range(1000):
+            now[0] += 7000000 + i % 3
+            sm.tick(0.01)
+        now[0] += 5000000000
+        sm.tick(0.01)
+        self.assertEqual(sm.remaining_ms(), 60000 - 7000 - 1 - 5000)
+        self.assertEqual(sm.get_time_string(), "00:47.999")
+
+        sm.clock.pause()
+        now[0] += 30000000000
+        sm.tick(0.01)
+        sm.clock.resume()
+        self.assertEqual(sm.get_time_string(), "00:47.999")
+
+        now[0] += 48000000000
+        sm.tick(0.01)
+        self.assertEqual(sm.state, GameState.TIME_OUT)
+        self.assertEqual(sm.get_time_string(), "00:00.000")
+
+    def test_log_ring_keeps_last_records(self):
+        sm = StateMachine()
+        for i in range(15):
+            sm.log(f"LINE {i}", level="WARNING" if i % 2 else "INFO")
+        self.assertEqual(len(sm.logs), 10)
+        self.assertEqual(sm.logs.count, 15)
+        self.assertEqual([record.message for record in sm.logs][0], "LINE 5")
+        self.assertEqual(list(sm.logs)[-1].level, "INFO")
+        sm.transition_to(GameState.BOOT)
+        self.assertEqual(len(sm.logs), 0)
+
+class TestGameEngine(unittest.TestCase):
+    def test_scripted_rounds(self):
+        sim, outcomes = simulate(len(ROUNDS) * 20)
+        self.assertEqual(set(result for _, result in outcomes), {"ok"})
+        self.assertEqual(sum(outcomes.values()), len(ROUNDS) * 20)
+
+    def test_fast_forward_matches_fixed_steps(self):
+        runs = []
+        for fast_forward in [True, False]:
+            sim = Simulator(fast_forward=fast_forward)
+            sim.run(setup_script() + press("*", 3.0) + press("*1234#", 5.0), until=120)
+            runs.append((sim.states, sim.buzzer.beeps, sim.steps))
+        self.assertEqual(runs[0][0], runs[1][0])
+        self.assertEqual([(round(t, 6), ms) for t, ms in runs[0][1]], [(round(t, 6), ms) for t, ms in runs[1][1]])
+        self.assertLess(runs[0][2], runs[1][2] / 10)
+        
+        # Defuse phase (40s): a beep per second down to 10s, then every 0.5s to 3s, then every 0.25s
+        sim = Simulator()
+        sim.run(setup_script() + press("*", 3.0) + press("*1234#", 5.0), until=120)
+        defuse_start = [t for t, ms in sim.buzzer.beeps if ms == 50][-1]
+        countdown = [t for t, ms in sim.buzzer.beeps if ms == 100 and t > defuse_start]
+        self.assertEqual(len(countdown), 30 + 14 + 12)
+        self.assertEqual(sim.states[-1], GameState.EXPLODED)
+
+    def test_cues_survive_low_frame_rates(self):
+        # Steps far longer than the 0.25s beep spacing still sound every countdown beep once
+        counts = []
+        for logic_hz in [100, 3]:
+            sim = Simulator(logic_hz=logic_hz, fast_forward=False)
+            sim.run(setup_script() + press("*", 3.0) + press("*1234#", 5.0), until=120)
+            counts.append(len([t for t, ms in sim.buzzer.beeps if ms == 100]))
+            self.assertEqual(sim.states[-1], GameState.EXPLODED)
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(counts[0], 30 + 14 + 12)
+
+    def test_random_keys_follow_transition_table(self):
+        allowed = set((state, target) for (state, _), (target, _) in TRANSITIONS.items())
+        sim = Simulator()
+        sm = sim.engine.sm
+        seen = []
+        left = []
+        sm.on_exit(None, lambda: left.append(sm.state))
+        sm.on_enter(None, lambda: seen.append((left[-1], sm.state)))
+
+        rng = random.Random(17)
+        script = []
+        at = 0.0
+        for _ in range(3000):
+            at += rng.choice([0.05, 0.2, 1.0, 5.0])
+            script += press(rng.choice("0123456789*#"), at, hold=rng.choice([0.05, 0.05, 2.5]))
+        sim.run(script)
+
+        self.assertGreater(len(set(seen)), 10)
+        self.assertEqual([pair for pair in seen if pair not in allowed], [])
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_recorded_rounds_aggregate(self):
+        for _ in range(2):
+            recorder = TelemetryRecorder(self.tmpdir, buffer_records=16)
+            simulate(len(ROUNDS) * 4, telemetry=recorder)
+            recorder.close()
+        paths = sorted(os.path.join(self.tmpdir, name) for name in os.listdir(self.tmpdir))
+        self.assertEqual(len(paths), 2)
+
+        stats = round_stats(*load_records(paths))
+        self.assertEqual(stats["sessions"], 2)
+        self.assertEqual(stats["rounds"], 2 * len(ROUNDS) * 4)
+        self.assertEqual(stats["outcomes"], {"EXPLODED": 8, "DEFUSED": 16, "TIME_OUT": 8})
+        self.assertEqual(stats["wrong_pins"], 2 * 4 * 2)  # wrong_pin rounds: one at arming, one at defusing
+        self.assertEqual(len(stats["time_to_defuse"]), 16)
+        # The scripted rounds defuse 15-17s after arming
+        self.assertTrue(all(10 < t < 20 for t in stats["time_to_defuse"]))
+
+    def test_replay_matches_recording(self):
+        recorder = TelemetryRecorder(self.tmpdir)
+        simulate(len(ROUNDS), telemetry=recorder)
+        recorder.close()
+        result = replay(recorder.path)
+        self.assertIsNone(result.divergence)
+        self.assertEqual(result.actual, GameState.READY)
+
+        # A different key in the recording: the replay no longer ends the same way
+        with open(recorder.path, "r+b") as f:
+            data = bytearray(f.read())
+            for offset in range(FILE_HEADER.size, len(data), RECORD.size):
+                t, kind, code, extra, timer_ms = RECORD.unpack_from(data, offset)
+                if kind == KEY and chr(code) == '#':
+                    RECORD.pack_into(data, offset, t, kind, ord('*'), extra, timer_ms)
+            f.seek(0)
+            f.write(data)
+        self.assertIsNotNone(replay(recorder.path).divergence)
+
+    def test_replay_matches_jittery_timeouts(self):
+        # Real clock with sub-millisecond jitter per step and one long stall: each round times out
+        rng = random.Random(7)
+        for _ in range(10):
+            now = [0]
+            recorder = TelemetryRecorder(self.tmpdir)
+            buzzer = RecordingBuzzer()
+            engine = GameEngine(buzzer, RecordingTelegram(), has_boot_video=False,
+                                clock=GameClock(lambda: now[0]), telemetry=recorder)
+            buzzer.engine = engine
+            engine.sm.set_times(2, 2)
+            script = press("1#2#2##", 0.1) + press("*", 2.0)  # Static PIN, 2s times, plant never armed
+            stall_at = rng.randrange(220, 380)
+            steps = 0
+            while engine.sm.state != GameState.TIME_OUT:
+                due = [KeyEvent(key, pressed, at) for at, key, pressed in script if steps / 100 <= at < (steps + 1) / 100]
+                now[0] += 10000000 + rng.randrange(-900000, 900000) + (200000000 if steps == stall_at else 0)
+                engine.step(0.01, due)
+                steps += 1
+            recorder.close()
+            result = replay(recorder.path)
+            self.assertIsNone(result.divergence)
+            self.assertEqual(result.actual, GameState.TIME_OUT)
+            # Drift is written when the countdown starts and on the stall, not for jitter
+            clocks = [record for record in read_session(recorder.path) if record[1] == CLOCK]
+            self.assertLessEqual(len(clocks), 2)
+
+class TestFrameProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_frames(self, profiler, count):
+        for _ in range(count):
+            profiler.begin_frame()
+            for phase in PHASES:
+                profiler.mark(phase)
+            profiler.end_frame()
+
+    def test_ring_file_keeps_last_frames(self):
+        path = os.path.join(self.tmpdir, "profile.ring")
+        profiler = FrameProfiler(history=10, path=path, capacity=4)
+        self.run_frames(profiler, 3) # Disabled: nothing recorded
+        self.assertEqual(len(profiler.samples["frame"]), 0)
+        self.assertFalse(os.path.exists(path))
+        
+        profiler.toggle()
+        self.run_frames(profiler, 6)
+        profiler.close()
+        self.assertEqual(len(profiler.samples["render"]), 6)
+        phases, records = read_ring(path)
+        self.assertEqual(phases, PHASES)
+        self.assertEqual(len(records), 4) # Wrapped, oldest two overwritten
+        self.assertEqual([r[0] for r in records], sorted(r[0] for r in records))
+        self.assertEqual(len(profiler.hud_lines()), len(PHASES) + 2)
+
+    def test_toggle_chord_stays_out_of_the_game(self):
+        chord = ToggleChord(keys=('*', '#'), hold=1.0, window=0.15)
+        def run(script, steps):
+            # script: {step: [(key, pressed)]}; returns (keys the game got, steps that toggled)
+            passed, toggles = [], []
+            for i in range(steps):
+                events = [KeyEvent(key, pressed, i / 100) for key, pressed in script.get(i, [])]
+                out, toggle = chord.filter(events, 0.01)
+                passed += [(e.key, e.pressed) for e in out]
+                if toggle:
+                    toggles.append(i)
+            return passed, toggles
+
+        # Chord held 2s: the game sees nothing (no round start, no # long-press reset), one toggle
+        passed, toggles = run({0: [('*', True)], 5: [('#', True)], 205: [('*', False), ('#', False)]}, 220)
+        self.assertEqual(passed, [])
+        self.assertEqual(toggles, [104])
+        # A quick * then digits: same order, * as soon as it is released
+        passed, toggles = run({0: [('*', True)], 3: [('*', False)], 4: [('1', True)], 6: [('1', False)]}, 10)
+        self.assertEqual(passed, [('*', True), ('*', False), ('1', True), ('1', False)])
+        # # held alone still reaches the game, after the window
+        passed, _ = run({0: [('#', True)], 150: [('#', False)]}, 160)
+        self.assertEqual(passed, [('#', True), ('#', False)])
+        self.assertEqual(toggles, [])
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class TestNetSync(unittest.TestCase):
+    def setUp(self):
+        prop_port, controller_port = free_udp_port(), free_udp_port()
+        self.prop = NetSync("prop-1", peers=[("127.0.0.1", controller_port)], bind_port=prop_port)
+        self.controller = NetSync("controller", peers=[("127.0.0.1", prop_port)], bind_port=controller_port)
+        self.prop.start()
+        self.controller.start()
+        self.sim = Simulator()
+        self.sim.run(setup_script(), until=1.0)
+        self.prop.attach(self.sim.engine.sm)
+
+    def tearDown(self):
+        self.prop.close()
+        self.controller.close()
+
+    def wait_for(self, condition, timeout=3.0):
+        end = time.monotonic() + timeout
+        while not condition() and time.monotonic() < end:
+            self.prop.update(self.sim.engine.sm)
+            time.sleep(0.005)
+        self.assertTrue(condition())
+
+    def test_controller_starts_and_resets_prop(self):
+        sm = self.sim.engine.sm
+        self.wait_for(lambda: "prop-1" in self.controller.peers)
+        peer = self.controller.peers["prop-1"]
+        for _ in range(5):
+            self.controller.ping()
+            time.sleep(0.01)
+        self.wait_for(lambda: len(peer.clock.samples) >= 3)
+        self.assertLess(peer.clock.rtt_ns, 50000000)
+        self.assertLess(abs(peer.clock.offset_ns), 5000000)  # Same host, same clock
+
+        self.controller.command("start", delay=0.05)
+        self.wait_for(lambda: sm.state == GameState.PLANT_PHASE)
+        self.wait_for(lambda: peer.state == "PLANT_PHASE")
+        self.assertEqual(peer.event, "start")
+        self.assertTrue(38000 < peer.remaining_ms(time.monotonic_ns()) <= 40000)
+
+        # Sent several times, applied once
+        self.controller.command("reset")
+        self.wait_for(lambda: peer.state == "PIN_TYPE_SELECT")
+        time.sleep(0.05)
+        self.prop.update(sm)
+        self.assertEqual(self.sim.buzzer.cancels, 1)
+        self.assertIsNone(peer.remaining_ms(time.monotonic_ns()))
+
+class TestStartup(unittest.TestCase):
+    def test_main_defers_heavy_imports(self):
+        # OpenCV (boot video) and requests (PIN mode 3) must not load with main.py
+        code = "import main, sys; print('cv2' in sys.modules, 'requests' in sys.modules)"
+        env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.split()[-2:], ["False", "False"])
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_test_video(path, frames=12, fps=10):
+    """Tiny MJPEG video, half the screen size, every frame a different colour"""
+    import cv2
+    import numpy as np
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (120, 160))
+    for i in range(frames):
+        frame = np.zeros((160, 120, 3), np.uint8)
+        frame[:] = (i * 20, 255 - i * 20, 100)
+        frame[:, :10] = 255  # Edge that survives the resize
+        writer.write(frame)
+    writer.release()
+    return path
+
+def decoded_frames(path):
+    """The video's frames as the players should show them: (width, height, 3) RGB at screen size"""
+    import cv2
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(boot_video.convert_frame(frame))
+    cap.release()
+    return frames
+
+class TestBootVideo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.video = make_test_video(os.path.join(self.tmpdir, "boot.avi"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_frames_past_budget_spill_to_memmap(self):
+        frame_mb = boot_video.SCREEN_SIZE[0] * boot_video.SCREEN_SIZE[1] * 3 / (1024 * 1024)
+        video = boot_video.load_video(self.video, memory_budget_mb=frame_mb * 3)
+        expected = decoded_frames(self.video)
+        self.assertEqual(video.frame_count, len(expected))
+        self.assertEqual(len(video.surfaces), 3)
+        spill_path = video.spill_path
+        self.assertTrue(os.path.exists(spill_path))
+        for i, frame in enumerate(expected):
+            self.assertTrue((pygame.surfarray.array3d(video.get_frame(i)) == frame).all(), f"frame {i}")
+        # Frozen on the last frame past the end
+        video.frame_at(60.0)
+        self.assertEqual(video.frame_index, len(expected) - 1)
+        video.close()
+        self.assertFalse(os.path.exists(spill_path))
+
+    def test_stream_drops_late_frames_and_stops(self):
+        expected = decoded_frames(self.video)
+        stream = boot_video.stream_video(self.video, queue_size=2)
+        self.assertTrue(stream.wait_ready(5.0))
+
+        def play_until(play_time, index):
+            deadline = time.monotonic() + 5.0
+            while stream.frame_index < index and time.monotonic() < deadline:
+                surface = stream.frame_at(play_time)
+                time.sleep(0.001)
+            return surface
+
+        surface = play_until(0.0, 0)  # Starts from the first frame whenever it is ready
+        self.assertTrue((pygame.surfarray.array3d(surface) == expected[0]).all())
+        self.assertLessEqual(stream._queue.qsize(), 2)  # Bounded: the decoder waits for the player
+        surface = play_until(0.85, 8)  # 10 FPS: frame 8, the ones in between are late
+        self.assertEqual(stream.frame_index, 8)
+        self.assertTrue((pygame.surfarray.array3d(surface) == expected[8]).all())
+        self.assertGreater(stream.frames_dropped, 0)
+
+        stream.close()
+        self.assertFalse(stream._thread.is_alive())
+        self.assertTrue(stream._queue.empty())
+
+class TestBootAnimation(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.video = make_test_video(os.path.join(self.tmpdir, "boot.avi"))
+        self.path = os.path.join(self.tmpdir, "boot.banm")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def play(self):
+        animation = boot_animation.load_animation(self.path)
+        frames = [pygame.surfarray.array3d(animation.get_frame(i)).astype(int) for i in range(animation.frame_count)]
+        animation.close()
+        return frames
+
+    def test_compiled_frames_round_trip(self):
+        expected = decoded_frames(self.video)
+        self.assertTrue(boot_animation.compile_animation(self.video, self.path))
+        self.assertFalse(boot_animation.compile_animation(self.video, self.path))  # Same source hash: skipped
+        self.assertTrue(boot_animation.is_up_to_date(self.video, self.path))
+        frames = self.play()
+        self.assertEqual(len(frames), len(expected))
+        for frame, decoded in zip(frames, expected):
+            self.assertTrue((frame == decoded).all())  # RGB888 is exact
+
+        # Another format is rebuilt even though the source is unchanged; 565 keeps 5/6/5 bits
+        self.assertTrue(boot_animation.compile_animation(self.video, self.path, boot_animation.FORMAT_RGB565))
+        for frame, decoded in zip(self.play(), expected):
+            self.assertLessEqual(abs(frame - decoded).max(), 7)
+
+        with open(self.video, "ab") as f:
+            f.write(b"\0")  # Source edited: the compiled file is stale
+        self.assertFalse(boot_animation.is_up_to_date(self.video, self.path))
+
+class TestRenderer(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        self.renderer = Renderer()
+        self.cache_size = config.TEXT_CACHE_SIZE
+
+    def tearDown(self):
+        config.TEXT_CACHE_SIZE = self.cache_size
+
+    def test_text_cache_evicts_least_recently_used(self):
+        config.TEXT_CACHE_SIZE = 3
+        r = self.renderer
+        font = r.font_small
+        a, b = r.render_text("A", font, config.COLOR_WHITE), r.render_text("B", font, config.COLOR_WHITE)
+        r.render_text("C", font, config.COLOR_WHITE)
+        self.assertIs(r.render_text("A", font, config.COLOR_WHITE), a)  # Hit: A is now the newest
+        r.render_text("D", font, config.COLOR_WHITE)  # Evicts B, the least recently used
+        self.assertIs(r.render_text("A", font, config.COLOR_WHITE), a)
+        self.assertIsNot(r.render_text("B", font, config.COLOR_WHITE), b)
+        self.assertIsNot(r.render_text("A", font, config.COLOR_RED), a)  # Colour is part of the key
+
+        # The countdown is drawn from one cached surface per character
+        config.TEXT_CACHE_SIZE = 128
+        r.update()
+        r.draw_countdown("01:23.450", r.font_countdown, config.COLOR_WHITE, (120, 100))
+        glyph_ops = r._ops
+        self.assertEqual(len(glyph_ops), 9)
+        self.assertIs(glyph_ops[0][1], glyph_ops[8][1])  # Both "0"s share a surface
+        xs = [op[2][0] for op in glyph_ops]
+        self.assertEqual(xs, sorted(xs))
+        full_width = r.render_text("01:23.450", r.font_countdown, config.COLOR_WHITE).get_width()
+        self.assertLessEqual(abs(sum(op[2][2] for op in glyph_ops) - full_width), 9)  # Kerning aside, same width
+
+    def test_dirty_rects_match_full_redraw(self):
+        r = self.renderer
+        sm = StateMachine()
+        video_frame = pygame.Surface(boot_video.SCREEN_SIZE)  # Reused for every frame, like the RGB565 player
+        states = [GameState.PIN_TYPE_SELECT, GameState.CONFIG, GameState.READY, GameState.PLANT_PHASE,
+                  GameState.DEFUSE_PHASE, GameState.DEFUSED, GameState.EXPLODED]
+        for frame in range(150):
+            if frame >= 10 and frame % 20 == 10:
+                sm.transition_to(states[(frame - 10) // 20])
+            if frame % 30 == 25:
+                sm.show_console = True
+                sm.log(f"LINE {frame}")
+            sm.tick(0.033)
+            video_frame.fill((frame * 25 % 256, 0, 0))
+            r.render(sm, str(frame % 7) * (frame % 4), "LABEL", screen_blink=frame // 5 % 2 == 0,
+                     text_blink=frame // 3 % 2 == 0, video_frame=video_frame, video_frame_id=frame)
+            r.update()
+
+            # The same ops drawn whole on a blank surface
+            full = pygame.Surface((r.width, r.height))
+            screen, r.screen = r.screen, full
+            r._replay(r._prev_ops)
+            r.screen = screen
+            self.assertTrue((pygame.surfarray.array3d(screen) == pygame.surfarray.array3d(full)).all(), f"frame {frame}")
+
+        # An unchanged frame has nothing to push
+        ops = r._prev_ops
+        self.assertEqual(r._dirty_rects(ops, list(ops)), [])
+
+    def test_static_layers_follow_state_and_blink(self):
+        r = self.renderer
+        sm = StateMachine()
+        sm.transition_to(GameState.CONFIG)
+        def frame():
+            r.render(sm, "12", "PLANT TIME")
+            r.update()
+            return pygame.surfarray.array3d(r.screen)
+
+        layer = r.get_layer(GameState.CONFIG)
+        before = pygame.surfarray.array3d(layer)
+        first = frame()
+        sm.plant_time = 95
+        second = frame()
+        # Dynamic text changes the screen, never the cached layer
+        self.assertFalse((first == second).all())
+        self.assertIs(r.get_layer(GameState.CONFIG), layer)
+        self.assertTrue((pygame.surfarray.array3d(layer) == before).all())
+
+        # State and blink pick their own layer, so nothing stale is shown after a change
+        plant, plant_blink = r.get_layer(GameState.PLANT_PHASE), r.get_layer(GameState.PLANT_PHASE, True)
+        self.assertIsNot(plant, layer)
+        self.assertIsNot(plant, plant_blink)
+        self.assertFalse((pygame.surfarray.array3d(plant) == pygame.surfarray.array3d(plant_blink)).all())
+        sm.transition_to(GameState.READY)
+        self.assertFalse((frame() == second).all())
+
+    def test_overlays_come_from_the_pool(self):
+        r = self.renderer
+        yellow = r.get_overlay(config.COLOR_YELLOW, 80)  # Made up front for the PLANT blink
+        pool_size = len(r._overlays)
+        for i in range(20):
+            r.clear()
+            r.draw_overlay(config.COLOR_YELLOW if i % 2 else config.COLOR_RED, 80)
+            r.update()
+            self.assertIs(r.get_overlay(config.COLOR_YELLOW, 80), yellow)
+        self.assertEqual(len(r._overlays), pool_size)  # Blinking allocates nothing
+        self.assertEqual(yellow.get_alpha(), 80)
+        self.assertEqual(yellow.get_bitsize(), r.screen.get_bitsize())  # Converted to the display format
+
+        # Last frame: 80/255 of yellow blended over black
+        tinted = r.screen.get_at((5, 5))
+        self.assertTrue(all(abs(tinted[i] - config.COLOR_YELLOW[i] * 80 // 255) <= 2 for i in range(3)))
+        self.assertIsNot(r.get_overlay(config.COLOR_YELLOW, 81), yellow)  # Other alpha: its own entry
+
+class TestFrameScheduler(unittest.TestCase):
+    def test_fixed_logic_steps(self):
+        clock = FakeClock()
+        scheduler = FrameScheduler(logic_hz=100, clock=clock)
+        
+        clock.now = 0.035
+        self.assertEqual(scheduler.logic_steps(), 3)
+        # Leftover 5ms carries over to the next frame
+        clock.now = 0.040
+        self.assertEqual(scheduler.logic_steps(), 1)
+        
+    def test_render_pacing(self):
+        clock = FakeClock()
+        scheduler = FrameScheduler(logic_hz=100, clock=clock)
+        
+        self.assertTrue(scheduler.should_render(5)) # First frame
+        clock.now = 0.1
+        self.assertFalse(scheduler.should_render(5)) # Idle screen, 200ms per frame
+        scheduler.request_render()
+        self.assertTrue(scheduler.should_render(5)) # Visible change renders right away
+        clock.now = 0.31
+        self.assertTrue(scheduler.should_render(5))
+
+class TestBuzzerDriver(unittest.TestCase):
+    def setUp(self):
+        self.outputs = []
+        self.done = threading.Event()
+        self.buzzer = BuzzerDriver(self.set_output)
+        self.buzzer.start()
+
+    def tearDown(self):
+        self.buzzer.stop()
+
+    def set_output(self, on):
+        self.outputs.append(on)
+        if len(self.outputs) >= 6:
+            self.done.set()
+
+    def test_pattern_does_not_block(self):
+        start = time.monotonic()
+        self.buzzer.play(50, gap_ms=20, repeat=3)
+        self.assertLess(time.monotonic() - start, 0.02)
+        
+        self.assertTrue(self.done.wait(1.0))
+        self.assertEqual(self.outputs, [True, False] * 3)
+
+    def test_cancel_stops_pattern(self):
+        self.buzzer.play(1000, repeat=5)
+        time.sleep(0.05)
+        self.buzzer.cancel()
+        time.sleep(0.05)
+        self.assertEqual(self.outputs, [True, False])
+
+class TestKeyDebouncer(unittest.TestCase):
+    def test_bounce_is_one_press(self):
+        debouncer = KeyDebouncer(['1', '#'], debounce_ms=20)
+        
+        # Contact bounce: on/off/on within the debounce window
+        self.assertEqual(debouncer.update({'1'}, 0.000), [])
+        self.assertEqual(debouncer.update(set(), 0.005), [])
+        self.assertEqual(debouncer.update({'1'}, 0.010), [])
+        self.assertEqual(debouncer.update({'1'}, 0.025), [])
+        self.assertEqual(debouncer.update({'1'}, 0.035), [KeyEvent('1', True, 0.010)])
+        self.assertEqual(debouncer.pressed_keys(), ['1'])
+        
+        # Release settles the same way
+        self.assertEqual(debouncer.update(set(), 0.100), [])
+        self.assertEqual(debouncer.update(set(), 0.125), [KeyEvent('1', False, 0.100)])
+        self.assertEqual(debouncer.pressed_keys(), [])
+
+class TestPlayerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "players.tsv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_registry_survives_restart(self):
+        registry = PlayerRegistry(self.path)
+        registry.add("11 99999-0001", team="T", chat_id="42")
+        for i in range(2, 301):
+            registry.add(f"1199999{i:04d}")
+        with self.assertRaises(RegistrationError):
+            registry.add("011 99999-0001")  # Same number, other spelling
+        with self.assertRaises(RegistrationError):
+            registry.add("12")
+        self.assertIn("011999990150", registry)
+        registry.record_reveal("11999990001")
+        registry.flush()
+        registry.close()
+
+        reloaded = PlayerRegistry(self.path).load()
+        self.assertEqual(len(reloaded), 300)
+        player = reloaded.get("11999990001")
+        self.assertEqual((player.team, player.chat_id, player.reveals), ("T", "42", 1))
+        self.assertEqual([p.phone for p in reloaded][:2], ["11999990001", "11999990002"])
+
+    def test_corrupt_line_keeps_other_players(self):
+        registry = PlayerRegistry(self.path)
+        registry.add("11999990001")
+        registry.add("11999990002")
+        registry.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("garbage without tabs\n")
+
+        reloaded = PlayerRegistry(self.path).load()
+        self.assertEqual(len(reloaded), 2)
+        reloaded.add("11999990003")
+        reloaded.wait()
+        self.assertEqual(len(PlayerRegistry(self.path).load()), 3)
+        with open(self.path + ".bad", encoding="utf-8") as f:
+            self.assertIn("garbage", f.read())
+
+    def test_dynamic_round_uses_registry(self):
+        sim = Simulator()
+        script = press("2#5551234#05551234#*", 0.5) + press("40#40##", 5.0) + press("*", 8.0)
+        script += press("*4321#", 9.0) + press("*5551234#", 12.0) + press("4321#", 14.0)
+        sim.run(script)
+        self.assertEqual(len(sim.engine.sm.players), 1)
+        self.assertEqual(sim.engine.sm.players.get("5551234").reveals, 1)
+        self.assertEqual(sim.states[-1], GameState.DEFUSED)
+
+        sim.run(press("#", 1.0, hold=2.5) + press("2#0000#", 4.0))  # Back to registration, clear the list
+        self.assertEqual(sim.engine.sm.state, GameState.PLAYER_REGISTRATION)
+        self.assertEqual(len(sim.engine.sm.players), 0)
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    """Answers with the next status from server.statuses (200 when exhausted)"""
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(self.path)
+        time.sleep(self.server.delay)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+class StubTelegramServer(ThreadingHTTPServer):
+    request_queue_size = 128  # A whole broadcast connects at once
+    daemon_threads = True
+
+@unittest.skipIf(requests is None, "requests not installed")
+class TestTelegramDelivery(unittest.TestCase):
+    def setUp(self):
+        self.server = StubTelegramServer(("127.0.0.1", 0), StubTelegramHandler)
+        self.server.requests = []
+        self.server.statuses = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmpdir = tempfile.mkdtemp()
+        
+        self.service = self.make_service()
+        self.results = []
+        self.done = threading.Event()
+
+    def make_service(self):
+        from bomb_app.telegram_service import TelegramService
+        service = TelegramService()
+        service.provider = "REAL"
+        service.token = "TEST"
+        service.api_url = f"http://127.0.0.1:{self.server.server_port}"
+        service.retry_backoff = 0.01
+        service.rate_per_chat = 100
+        service.outbox_path = os.path.join(self.tmpdir, "outbox.db")
+        return service
+
+    def tearDown(self):
+        self.service.stop(timeout=2)
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def on_status(self, chat_id, message, sent):
+        self.results.append((chat_id, message, sent))
+        self.done.set()
+
+    def test_retries_until_sent(self):
+        self.server.statuses = [500, 502]
+        start = time.monotonic()
+        self.assertTrue(self.service.send_message_async("42", "BOMB PLANTED!", self.on_status))
+        self.assertLess(time.monotonic() - start, 0.05) # Never blocks the game loop
+        
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [("42", "BOMB PLANTED!", True)])
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.requests[0], "/botTEST/sendMessage")
+
+    def test_client_error_is_not_retried(self):
+        self.server.statuses = [400]
+        self.service.send_message_async("42", "PIN FOR DEFUSE: 1234", self.on_status)
+        
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [("42", "PIN FOR DEFUSE: 1234", False)])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_broadcast_is_concurrent_and_coalesced(self):
+        self.server.delay = 0.3
+        chats = ["1", "2", "3", "4"]
+        start = time.monotonic()
+        self.assertEqual(self.service.broadcast(chats, "BOMB PLANTED!"), 4)
+        self.service.broadcast(chats, "BOMB PLANTED!") # Rapid repeat of the same event
+        self.service.stop(timeout=5)
+        
+        # One round trip per chat, sent side by side rather than one after another
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertLess(time.monotonic() - start, 0.3 * 3)
+
+    def test_broadcast_time_stays_flat(self):
+        from bomb_app.telegram_service import TokenBucket
+        self.server.delay = 0.3
+        self.service._global_bucket = TokenBucket(1000, 1000)  # Only the chat count under test
+        chats = [str(chat_id) for chat_id in range(1, 51)]
+        start = time.monotonic()
+        self.assertEqual(self.service.broadcast(chats, "BOMB PLANTED!"), 50)
+        self.service.stop(timeout=5)
+        
+        # 50 chats in about the time of one, not ceil(50 / TELEGRAM_WORKERS) round trips
+        self.assertEqual(len(self.server.requests), 50)
+        self.assertLess(time.monotonic() - start, 0.3 * 2)
+
+    def test_outbox_survives_restart(self):
+        self.server.statuses = [503, 503]
+        self.service.max_retries = 1
+        self.service.send_message_async("42", "BOMB PLANTED!", self.on_status)
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.results, [("42", "BOMB PLANTED!", False)])
+        self.service.stop(timeout=2) # e.g. power cut before the network came back
+        
+        self.service = self.make_service()
+        self.service.start()
+        for _ in range(100):
+            if len(self.server.requests) == 3:
+                break
+            time.sleep(0.05)
+        self.service.stop(timeout=2)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(TelegramOutbox(self.service.outbox_path).pending(), [])
+
+    def test_send_does_not_wait_for_the_outbox(self):
+        import bomb_app.telegram_service as telegram_service
+        class SlowOutbox(TelegramOutbox):
+            def __init__(self, path):
+                time.sleep(0.3)  # e.g. a slow SD card
+                super().__init__(path)
+        self.server.statuses = [503] * 20  # Network stays down
+        self.service.max_retries = 1
+        original = telegram_service.TelegramOutbox
+        telegram_service.TelegramOutbox = SlowOutbox
+        try:
+            start = time.monotonic()
+            self.assertTrue(self.service.send_message_async("42", "BOMB PLANTED!", self.on_status))
+            self.assertLess(time.monotonic() - start, 0.05)
+            self.assertTrue(self.done.wait(5))
+            self.service.stop(timeout=2)
+        finally:
+            telegram_service.TelegramOutbox = original
+        
+        # Sent before the outbox was open, still kept there for the next run
+        self.assertEqual(self.results[0], ("42", "BOMB PLANTED!", False))
+        self.assertEqual([row[1:3] for row in TelegramOutbox(self.service.outbox_path).pending()], [("42", "BOMB PLANTED!")])
+
+class TestTelegramOutbox(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "outbox.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_idempotent_records(self):
+        outbox = TelegramOutbox(self.path)
+        outbox.start()
+        stored = []
+        outbox.add("plant:42", "42", "BOMB PLANTED!", on_stored=stored.append)
+        outbox.add("plant:42", "42", "BOMB PLANTED! 40s", on_stored=stored.append) # Same key, newer text
+        outbox.add("pin:42", "42", "PIN FOR DEFUSE: 1234")
+        outbox.mark_delivered("pin:42")
+        outbox.close()
+        
+        outbox = TelegramOutbox(self.path)
+        self.assertEqual(outbox.pending(), [("plant:42", "42", "BOMB PLANTED! 40s", None)])
+        outbox.start()
+        outbox.add("pin:42", "42", "PIN FOR DEFUSE: 1234", on_stored=stored.append) # Already delivered
+        outbox.close()
+        self.assertEqual(stored, [True, True, False])
+
 if __name__ == '__main__':
     unittest.main()